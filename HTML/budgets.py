@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Size and build-time budgets for the generated map pages
+Builds every page, measures each one (page plus the layer payloads it
+fetches) and checks the pages listed under 'pages' in budgets.json against
+their limits, with 'default' filling in any limit a page does not set, and
+the whole build against 'total'. Prints a per-page diff against the previous
+passing build and exits 1 when any budget is exceeded.
+
+A listed page that this build did not write (its inputs are not in RAW
+DOWNLOADS) is skipped, unless the previous passing build had it: a page that
+disappears is a failure.
+
+Usage: python budgets.py            build, then check
+       python budgets.py --no-build check the pages already on disk (no build times)
+"""
+
+import gzip
+import os
+import re
+import subprocess
+import sys
+import time
+
+import edition_delta
+import json_backend
+import layer_worker
+import raw_store
+import visualize_all_maps
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
+BUDGETS_FILE = os.path.join(SCRIPT_DIR, 'budgets.json')
+REPORT_FILE = os.path.join(OUT_DIR, 'build_report.json')
+
+# Generator scripts and the page each one writes, run after visualize_all_maps
+SCRIPT_PAGES = {
+    'convert_maps.py': 'armed_groups_map.html',
+    'convert_attacks_map.py': 'attacks_on_signatories_map.html',
+    'fix_ddhh_map.py': 'ddhh_human_rights_map.html',
+}
+
+# (budgets.json key, report key, label)
+METRICS = [
+    ('max_bytes', 'bytes', 'bytes'),
+    ('max_gzip_bytes', 'gzip_bytes', 'gzip bytes'),
+    ('max_features', 'features', 'features'),
+    ('max_vertices', 'vertices', 'vertices'),
+    ('max_build_seconds', 'build_seconds', 'build seconds'),
+]
+
+GZIP_LEVEL = 6    # typical web server setting
+
+TOTAL = '(total build)'   # report entry for the whole build
+
+WORKER_SOURCE = re.compile(r"""workerLayer\((?:'([^']+)'|(\{"base":"[^"]+","delta":"[^"]+"\}))""")
+INLINE_FEATURE = re.compile(r'"type":"Feature"')
+# Hexbinned layers count the points behind their cells
+HEXBIN_TOTAL = re.compile(r'hexbinLayer\(\{"total":(\d+)')
+# Inline payloads are compact JSON, which tells their [lng,lat] pairs apart
+# from hand-written page code such as setView([4.5, -74], 6)
+INLINE_VERTEX = re.compile(r'\[-?\d+(?:\.\d+)?(?:e[-+]?\d+)?,-?\d+(?:\.\d+)?(?:e[-+]?\d+)?\]')
+
+def build():
+    """Build every page; returns {page: seconds} for the pages written, plus TOTAL"""
+    times = {}
+    build_start = time.perf_counter()
+    raw_store.ingest()
+    for spec in visualize_all_maps.MAPS:
+        # Cold layer cache, so a page is not timed cheaper for sharing layers
+        # with the page built before it
+        visualize_all_maps._converted.clear()
+        start = time.perf_counter()
+        if visualize_all_maps.build_map(spec):
+            times[spec['filename']] = time.perf_counter() - start
+
+    for script, page in SCRIPT_PAGES.items():
+        print(f"\n=== {script} ===")
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script], cwd=SCRIPT_DIR)
+        if result.returncode != 0:
+            print(f"[!] {script} exited with {result.returncode}")
+            continue
+        # Pages written by more than one stage pay for all of them
+        times[page] = times.get(page, 0) + time.perf_counter() - start
+    times[TOTAL] = time.perf_counter() - build_start
+    layer_worker.prune_layers(OUT_DIR)
+    return times
+
+def count_geometry(geojson):
+    """(features, vertices) of a FeatureCollection"""
+    vertices = 0
+    for feat in geojson.get('features', []):
+        g = feat.get('geometry') or {}
+        stack = [g.get('coordinates') or []]
+        while stack:
+            c = stack.pop()
+            if c and isinstance(c[0], (int, float)):
+                vertices += 1
+            else:
+                stack.extend(c)
+    return len(geojson.get('features', [])), vertices
+
+def read_payload(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return text, json_backend.loads(text)
+
+def measure(page):
+    """Bytes, gzip bytes, features and vertices of a page and every payload it fetches"""
+    with open(os.path.join(OUT_DIR, page), 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    texts = [html]
+    points = sum(int(n) for n in HEXBIN_TOTAL.findall(html))
+    features = len(INLINE_FEATURE.findall(html)) + points
+    vertices = len(INLINE_VERTEX.findall(html)) + points
+    for url, edition in WORKER_SOURCE.findall(html):
+        if url:
+            text, geojson = read_payload(os.path.join(OUT_DIR, url))
+            texts.append(text)
+        else:
+            source = json_backend.loads(edition)
+            base_text, base = read_payload(os.path.join(OUT_DIR, source['base']))
+            delta_text, delta = read_payload(os.path.join(OUT_DIR, source['delta']))
+            texts += [base_text, delta_text]
+            geojson = edition_delta.apply(base, delta)
+        n, v = count_geometry(geojson)
+        features += n
+        vertices += v
+
+    data = [t.encode('utf-8') for t in texts]
+    return {
+        'bytes': sum(len(d) for d in data),
+        'gzip_bytes': sum(len(gzip.compress(d, GZIP_LEVEL)) for d in data),
+        'features': features,
+        'vertices': vertices,
+    }
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json_backend.load(f)
+
+def format_value(key, value):
+    if value is None:
+        return '-'
+    if key == 'build_seconds':
+        return f"{value:.2f}"
+    return f"{value:,}"
+
+def print_metrics(current, before, limits):
+    """One line per metric; returns the number of limits exceeded"""
+    exceeded = 0
+    for limit_key, key, label in METRICS:
+        if key not in current:
+            continue
+        value = current[key]
+        old = before.get(key)
+        change = ''
+        if old:
+            change = f"{(value - old) / old * 100:+.1f}%"
+        limit = limits.get(limit_key)
+        over = limit is not None and value > limit
+        exceeded += over
+        print(f"  {'!' if over else ' '} {label:<14}{format_value(key, value):>14}"
+              f"   prev {format_value(key, old):>12} {change:>8}"
+              f"   budget {format_value(key, limit):>12}{'  OVER' if over else ''}")
+    return exceeded
+
+def check(report, previous, budgets):
+    """Print every listed page's metrics against the previous build; returns the number of failures"""
+    exceeded = 0
+    default = budgets.get('default', {})
+    for page, limits in budgets.get('pages', {}).items():
+        print(f"\n  {page}")
+        current = report.get(page)
+        if current is None:
+            if page in previous:
+                print(f"  ! not built, but the previous build had it")
+                exceeded += 1
+            else:
+                print(f"    skipped, not built (inputs missing)")
+            continue
+        exceeded += print_metrics(current, previous.get(page, {}), dict(default, **limits))
+
+    if TOTAL in report:
+        print(f"\n  {TOTAL}")
+        exceeded += print_metrics(report[TOTAL], previous.get(TOTAL, {}), budgets.get('total', {}))
+    return exceeded
+
+if __name__ == "__main__":
+    budgets = load_json(BUDGETS_FILE, {})
+    no_build = '--no-build' in sys.argv
+    times = {} if no_build else build()
+
+    report = {}
+    for page in budgets.get('pages', {}):
+        # Without a build, whatever is on disk; otherwise only what this build wrote
+        if not (os.path.exists(os.path.join(OUT_DIR, page)) if no_build else page in times):
+            continue
+        report[page] = measure(page)
+        if page in times:
+            report[page]['build_seconds'] = round(times[page], 3)
+    if TOTAL in times:
+        report[TOTAL] = {'build_seconds': round(times[TOTAL], 3)}
+
+    print("\n" + "=" * 60)
+    print("BUDGET CHECK")
+    print("=" * 60)
+    previous = load_json(REPORT_FILE, {})
+    exceeded = check(report, previous, budgets)
+
+    if exceeded:
+        print(f"\n[!] {exceeded} budget(s) exceeded")
+        sys.exit(1)
+
+    # Only passing builds become the baseline for the next diff
+    if no_build:
+        # Keep the build times this check did not measure
+        for entry, old in previous.items():
+            if entry == TOTAL:
+                report[TOTAL] = old
+            elif entry in report and 'build_seconds' in old:
+                report[entry]['build_seconds'] = old['build_seconds']
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json_backend.dump(report, f)
+    print(f"\n[+] {len(report) - (TOTAL in report)} page(s) within budget")
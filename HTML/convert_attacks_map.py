@@ -3,10 +3,12 @@
 Convert Attacks on Peace Signatories data to interactive choropleth map
 """
 
-import json
 import math
 import os
 
+import json_backend
+import layer_worker
+
 RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
 OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
 
@@ -20,12 +22,20 @@ def convert_ring(ring):
     """Convert a ring of coordinates from Web Mercator to WGS84"""
     return [web_mercator_to_wgs84(coord[0], coord[1]) for coord in ring]
 
+def attack_color(total):
+    """Fill color for a department's attack count (same classes as getColor() on the page)"""
+    return ('#a50f15' if total > 10 else
+            '#de2d26' if total > 6 else
+            '#fb6a4a' if total > 3 else
+            '#fcae91' if total > 0 else
+            '#fee5d9')
+
 def load_and_convert_attacks():
     """Load attacks data and convert to GeoJSON"""
     filepath = os.path.join(RAW_DIR, "Afectaciones_Firmantes_2025.json")
 
     with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        data = json_backend.load(f)
 
     features = []
     total_homicides = 0
@@ -267,9 +277,9 @@ def create_attacks_map(geojson, stats):
                                '#fee5d9';
         }}
 
-        function style(feature) {{
+        function style(props) {{
             return {{
-                fillColor: getColor(feature.properties.total),
+                fillColor: getColor(props.total),
                 weight: 2,
                 opacity: 1,
                 color: '#333',
@@ -277,8 +287,7 @@ def create_attacks_map(geojson, stats):
             }};
         }}
 
-        function onEachFeature(feature, layer) {{
-            var p = feature.properties;
+        function popupContent(p) {{
             var popup = '<b>' + p.department + '</b><br>' +
                         '<table style="font-size:12px;">' +
                         '<tr><td>Homicides:</td><td><b>' + p.homicides + '</b></td></tr>' +
@@ -287,14 +296,15 @@ def create_attacks_map(geojson, stats):
                         '<tr><td>Threats:</td><td><b>' + p.threats + '</b></td></tr>' +
                         '<tr><td colspan="2" style="border-top:1px solid #ccc;"><b>Total: ' + p.total + '</b></td></tr>' +
                         '</table>';
-            layer.bindPopup(popup);
+            return popup;
         }}
 
-        var attacksData = {json.dumps(geojson)};
+        // Department polygons are decoded in a Web Worker and filled in when ready
+        {layer_worker.loader_js()}
 
-        L.geoJSON(attacksData, {{
+        workerLayer('{layer_worker.write_layer(OUT_DIR, geojson)}', {{
             style: style,
-            onEachFeature: onEachFeature
+            popup: popupContent
         }}).addTo(map);
 
     </script>
@@ -319,7 +329,7 @@ if __name__ == "__main__":
     # Save GeoJSON
     geojson_path = os.path.join(OUT_DIR, "attacks_signatories.geojson")
     with open(geojson_path, 'w', encoding='utf-8') as f:
-        json.dump(geojson, f)
+        json_backend.dump(geojson, f)
     print(f"\n[+] GeoJSON saved to: {geojson_path}")
 
     html_path = create_attacks_map(geojson, stats)
@@ -4,10 +4,12 @@ Convert ArcGIS JSON to GeoJSON and create interactive map
 Colombia Armed Group Territories - OSINT Visualization
 """
 
-import json
 import math
 import os
 
+import json_backend
+import layer_worker
+
 RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
 OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
 
@@ -75,8 +77,8 @@ def arcgis_to_geojson(arcgis_data, layer_name):
         "features": features
     }
 
-def convert_all_territories():
-    """Convert all territory files to GeoJSON"""
+def load_territories():
+    """Convert the territory files that exist, without writing anything"""
     all_layers = {}
 
     for filename, info in TERRITORY_FILES.items():
@@ -84,7 +86,7 @@ def convert_all_territories():
         if os.path.exists(filepath):
             print(f"Converting {filename}...")
             with open(filepath, 'r', encoding='utf-8') as f:
-                arcgis_data = json.load(f)
+                arcgis_data = json_backend.load(f)
 
             geojson = arcgis_to_geojson(arcgis_data, info['name'])
             all_layers[info['name']] = {
@@ -92,17 +94,25 @@ def convert_all_territories():
                 'color': info['color'],
                 'count': len(geojson['features'])
             }
-
-            # Save individual GeoJSON
-            out_file = os.path.join(OUT_DIR, f"{info['name'].replace(' ', '_')}.geojson")
-            with open(out_file, 'w', encoding='utf-8') as f:
-                json.dump(geojson, f)
-            print(f"  -> {geojson['features'].__len__()} features saved to {out_file}")
         else:
             print(f"  [!] File not found: {filepath}")
 
     return all_layers
 
+def convert_all_territories():
+    """Convert all territory files to GeoJSON"""
+    all_layers = load_territories()
+
+    for name, layer in all_layers.items():
+        # Save individual GeoJSON
+        geojson = layer['geojson']
+        out_file = os.path.join(OUT_DIR, f"{name.replace(' ', '_')}.geojson")
+        with open(out_file, 'w', encoding='utf-8') as f:
+            json_backend.dump(geojson, f)
+        print(f"  -> {geojson['features'].__len__()} features saved to {out_file}")
+
+    return all_layers
+
 def create_html_map(layers):
     """Create interactive HTML map with Leaflet"""
 
@@ -111,8 +121,8 @@ def create_html_map(layers):
     for name, data in layers.items():
         layer_js.append(f"""
         // {name}
-        var {name.replace(' ', '_').replace('(', '').replace(')', '')} = L.geoJSON({json.dumps(data['geojson'])}, {{
-            style: function(feature) {{
+        var {name.replace(' ', '_').replace('(', '').replace(')', '')} = workerLayer('{layer_worker.write_layer(OUT_DIR, data['geojson'])}', {{
+            style: function(props) {{
                 return {{
                     fillColor: '{data['color']}',
                     weight: 2,
@@ -121,8 +131,8 @@ def create_html_map(layers):
                     fillOpacity: 0.4
                 }};
             }},
-            onEachFeature: function(feature, layer) {{
-                layer.bindPopup('<b>{name}</b><br>Features: {data["count"]}');
+            popup: function(props) {{
+                return '<b>{name}</b><br>Features: {data["count"]}';
             }}
         }});
         """)
@@ -243,7 +253,8 @@ def create_html_map(layers):
             maxZoom: 19
         }}).addTo(map);
 
-        // Territory layers
+        // Territory layers, decoded in a Web Worker and filled in as they arrive
+        {layer_worker.loader_js()}
         {"".join(layer_js)}
 
         // Add all layers to map
@@ -0,0 +1,142 @@
+"""
+Delta encoding between editions of the same map
+A later edition of a layer is stored as the features added, removed and
+modified since a base edition. The page fetches the base payload (the same
+file the base edition's page uses, so it is cached once) plus the small
+delta, and the worker patches one into the other.
+
+Delta payload:
+  removed   positions in the base 'features' that are gone
+  modified  [base position, patch]; a patch carries 'properties' and/or
+            'geometry', whichever changed
+  added     new features, appended after the patched base features
+  index     spatial index of the patched layer, only when geometry moved and
+            the patched layer still has features with a position
+"""
+
+import hashlib
+
+import json_backend
+import layer_worker
+import spatial_index
+
+# Attributes that identify a feature across editions, tried in order
+KEY_FIELDS = ['OBJECTID']
+
+def geometry_hash(feature):
+    """Content hash of a feature's geometry"""
+    text = json_backend.dumps(feature.get('geometry'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def feature_key(feature):
+    """Value of the first KEY_FIELDS attribute the feature has, or None"""
+    props = feature.get('properties') or {}
+    for field in KEY_FIELDS:
+        if props.get(field) is not None:
+            return (field, props[field])
+    return None
+
+def match_features(base, edition):
+    """Pair edition features with base features: same geometry first, then same key
+
+    Returns ({edition position: base position}, unmatched base positions).
+    """
+    matches = {}
+    free = set(range(len(base)))
+
+    by_geometry = {}
+    for i, feat in enumerate(base):
+        by_geometry.setdefault(geometry_hash(feat), []).append(i)
+    for j, feat in enumerate(edition):
+        candidates = by_geometry.get(geometry_hash(feat))
+        if candidates:
+            # Prefer an identical feature among equal geometries
+            i = next((c for c in candidates if base[c] == feat), candidates[0])
+            candidates.remove(i)
+            matches[j] = i
+            free.discard(i)
+
+    by_key = {}
+    for i in sorted(free):
+        key = feature_key(base[i])
+        if key is not None:
+            by_key.setdefault(key, i)
+    for j, feat in enumerate(edition):
+        if j in matches:
+            continue
+        key = feature_key(feat)
+        if key in by_key:
+            i = by_key.pop(key)
+            matches[j] = i
+            free.discard(i)
+    return matches, free
+
+def diff(base, edition):
+    """Delta that turns FeatureCollection base into edition (feature order aside)"""
+    base_features = base.get('features', [])
+    features = edition.get('features', [])
+    matches, removed = match_features(base_features, features)
+
+    modified = []
+    added = []
+    for j, feat in enumerate(features):
+        if j not in matches:
+            added.append(feat)
+            continue
+        i = matches[j]
+        old = base_features[i]
+        patch = {}
+        if feat.get('properties') != old.get('properties'):
+            patch['properties'] = feat.get('properties')
+        if feat.get('geometry') != old.get('geometry'):
+            patch['geometry'] = feat.get('geometry')
+        if patch:
+            modified.append([i, patch])
+
+    delta = {'removed': sorted(removed), 'modified': sorted(modified, key=lambda m: m[0]), 'added': added}
+    if geometry_moved(delta):
+        index = spatial_index.add_index(apply(base, delta)).get('index')
+        if index is not None:
+            delta['index'] = index
+    return delta
+
+def geometry_moved(delta):
+    """True when the base index no longer fits the patched layer"""
+    return bool(delta['removed'] or delta['added'] or any('geometry' in patch for _, patch in delta['modified']))
+
+def apply(base, delta):
+    """Patch a base FeatureCollection with a delta (mirrors the worker code)"""
+    removed = set(delta['removed'])
+    modified = dict((i, patch) for i, patch in delta['modified'])
+    features = []
+    for i, feat in enumerate(base.get('features', [])):
+        if i in removed:
+            continue
+        if i in modified:
+            feat = dict(feat)
+            feat.update(modified[i])
+        features.append(feat)
+    return {'type': 'FeatureCollection', 'features': features + delta['added']}
+
+def changes(delta):
+    """(added, removed, modified) counts"""
+    return len(delta['added']), len(delta['removed']), len(delta['modified'])
+
+def write_edition(out_dir, base, edition, delta=None):
+    """Write a layer as a delta over its base edition when that is smaller
+
+    delta is computed here unless the caller already has it. Returns
+    (source, (added, removed, modified)); source is what workerLayer() takes:
+    a URL for a full payload, or {'base': url, 'delta': url}.
+    """
+    if delta is None:
+        delta = diff(base, edition)
+    delta_text = json_backend.dumps(delta)
+    full_text = json_backend.dumps(spatial_index.add_index(edition))
+    if len(delta_text) >= len(full_text):
+        return layer_worker.write_payload(out_dir, full_text), changes(delta)
+    source = {
+        'base': layer_worker.write_layer(out_dir, base),
+        'delta': layer_worker.write_payload(out_dir, delta_text),
+    }
+    return source, changes(delta)
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Fix DDHH Human Rights Map - Data is already in WGS84"""
 
-import json
 import os
 
+import hexbin
+import json_backend
+
 RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
 OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
 
@@ -39,7 +41,7 @@ def load_file(filename):
         return None
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = json_backend.load(f)
         if 'error' in data:
             print(f"  Error in {filename}: {data['error']}")
             return None
@@ -65,6 +67,9 @@ for filename, name, color in files_to_load:
     geojson = load_file(filename)
     if geojson and geojson['features']:
         layers[name] = {'geojson': geojson, 'color': color}
+        # Dense point layers ship as hex cell counts instead of one marker per point
+        if hexbin.is_dense_point_layer(geojson):
+            layers[name]['hexbin'] = hexbin.aggregate(geojson)
 
 print(f"\nTotal layers: {len(layers)}")
 total_features = sum(len(l['geojson']['features']) for l in layers.values())
@@ -80,8 +85,14 @@ for name, data in layers.items():
     color = data['color']
     geojson = data['geojson']
 
+    if 'hexbin' in data:
+        layer_js.append(hexbin.layer_js(safe_name, name, data['hexbin']))
+        overlay_items.append(f'"{name}": {safe_name}')
+        legend_items.append(f'<div class="legend-item"><div class="legend-color" style="background:{hexbin.HEX_COLORS[-1]}"></div>{name} ({len(geojson["features"])}, binned)</div>')
+        continue
+
     layer_js.append(f"""
-        var {safe_name} = L.geoJSON({json.dumps(geojson)}, {{
+        var {safe_name} = L.geoJSON({json_backend.dumps(geojson)}, {{
             style: function(feature) {{
                 return {{
                     fillColor: '{color}',
@@ -174,6 +185,7 @@ html = f"""<!DOCTYPE html>
             attribution: '&copy; OpenStreetMap &copy; CARTO',
             subdomains: 'abcd', maxZoom: 19
         }}).addTo(map);
+        {hexbin.HEXBIN_JS if any('hexbin' in l for l in layers.values()) else ''}
         {''.join(layer_js)}
         var overlays = {{ {', '.join(overlay_items)} }};
         L.control.layers(null, overlays, {{collapsed: false}}).addTo(map);
@@ -0,0 +1,155 @@
+"""
+Hexagonal binning for dense point layers
+Aggregates point features into hex cell counts at several resolutions, so a
+page draws a fixed number of cells instead of one marker per point
+"""
+
+import math
+
+import json_backend
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# (min zoom, hex size in degrees) - each resolution is used from its min zoom
+# until the next one takes over
+HEX_RESOLUTIONS = [(0, 0.8), (7, 0.3), (9, 0.1), (11, 0.03)]
+
+# Point layers with fewer features than this keep one marker per feature
+HEXBIN_MIN_POINTS = 200
+
+# Choropleth ramp, lightest to darkest (same reds as the attacks map)
+HEX_COLORS = ['#fee5d9', '#fcae91', '#fb6a4a', '#de2d26', '#a50f15']
+
+SQRT3 = math.sqrt(3)
+
+def point_coords(geojson):
+    """[lon, lat] of every Point feature in a FeatureCollection"""
+    return [f['geometry']['coordinates'] for f in geojson.get('features', [])
+            if f.get('geometry') and f['geometry'].get('type') == 'Point']
+
+def is_dense_point_layer(geojson):
+    """True when a layer is all points and has enough of them to be worth binning"""
+    features = geojson.get('features', [])
+    return len(features) >= HEXBIN_MIN_POINTS and len(point_coords(geojson)) == len(features)
+
+def _cube_round(q, r):
+    """Round fractional axial coordinates to the containing hex"""
+    x, z = q, r
+    y = -x - z
+    rx, ry, rz = round(x), round(y), round(z)
+    dx, dy, dz = abs(rx - x), abs(ry - y), abs(rz - z)
+    if dx > dy and dx > dz:
+        rx = -ry - rz
+    elif dy <= dz:
+        rz = -rx - ry
+    return int(rx), int(rz)
+
+def _cube_round_np(q, r):
+    """Vectorized _cube_round over arrays of axial coordinates"""
+    x, z = q, r
+    y = -x - z
+    rx, ry, rz = np.round(x), np.round(y), np.round(z)
+    dx, dy, dz = np.abs(rx - x), np.abs(ry - y), np.abs(rz - z)
+    fix_x = (dx > dy) & (dx > dz)
+    fix_z = ~fix_x & (dy <= dz)
+    rx = np.where(fix_x, -ry - rz, rx)
+    rz = np.where(fix_z, -rx - ry, rz)
+    return rx.astype(np.int64), rz.astype(np.int64)
+
+def bin_points(coords, size):
+    """Count points per pointy-top hex of the given size; returns sorted [q, r, count] cells"""
+    if not coords:
+        return []
+
+    if np is not None:
+        # Positions may carry an altitude, and not all of them need to
+        xy = np.asarray([p[:2] for p in coords], dtype=float)
+        q = (SQRT3 / 3 * xy[:, 0] - xy[:, 1] / 3) / size
+        r = (2 / 3 * xy[:, 1]) / size
+        qi, ri = _cube_round_np(q, r)
+        cells, counts = np.unique(np.stack([qi, ri], axis=1), axis=0, return_counts=True)
+        return [[int(c[0]), int(c[1]), int(n)] for c, n in zip(cells, counts)]
+
+    counts = {}
+    for p in coords:
+        key = _cube_round((SQRT3 / 3 * p[0] - p[1] / 3) / size, (2 / 3 * p[1]) / size)
+        counts[key] = counts.get(key, 0) + 1
+    return [[q, r, n] for (q, r), n in sorted(counts.items())]
+
+def class_breaks(counts, classes=len(HEX_COLORS)):
+    """Lower bound of each color class, from the quantiles of the cell counts"""
+    values = sorted(counts)
+    breaks = []
+    for i in range(classes):
+        value = values[min(len(values) - 1, (len(values) * i) // classes)]
+        breaks.append(max(value, breaks[-1] + 1) if breaks else value)
+    return breaks
+
+def aggregate(geojson):
+    """Bin a point layer at every resolution; only cell counts and color breaks are kept"""
+    coords = point_coords(geojson)
+    resolutions = []
+    for min_zoom, size in HEX_RESOLUTIONS:
+        cells = bin_points(coords, size)
+        resolutions.append({
+            'minZoom': min_zoom,
+            'size': size,
+            'breaks': class_breaks([c[2] for c in cells]),
+            'cells': cells,
+        })
+    return {'total': len(coords), 'resolutions': resolutions}
+
+# Shared page code: builds the hex polygons for the current zoom on the client
+HEXBIN_JS = """
+        function hexbinLayer(data, name, colors) {
+            var group = L.layerGroup();
+            var map = null;
+            var current = null;
+            function pick(zoom) {
+                var res = data.resolutions[0];
+                data.resolutions.forEach(function(r) { if (zoom >= r.minZoom) res = r; });
+                return res;
+            }
+            function fill(count, breaks) {
+                for (var i = breaks.length - 1; i > 0; i--) {
+                    if (count >= breaks[i]) return colors[i];
+                }
+                return colors[0];
+            }
+            function hexagon(q, r, size) {
+                var cx = size * Math.sqrt(3) * (q + r / 2), cy = size * 1.5 * r;
+                var pts = [];
+                for (var i = 0; i < 6; i++) {
+                    var a = Math.PI / 180 * (60 * i - 30);
+                    pts.push([cy + size * Math.sin(a), cx + size * Math.cos(a)]);
+                }
+                return pts;
+            }
+            function draw() {
+                var res = pick(map.getZoom());
+                if (res === current) return;
+                current = res;
+                group.clearLayers();
+                res.cells.forEach(function(c) {
+                    L.polygon(hexagon(c[0], c[1], res.size), {
+                        fillColor: fill(c[2], res.breaks),
+                        weight: 1,
+                        color: '#333',
+                        fillOpacity: 0.7
+                    }).bindPopup('<b>' + name + '</b><br>Points: ' + c[2]).addTo(group);
+                });
+            }
+            group.on('add', function() { map = group._map; current = null; draw(); map.on('zoomend', draw); });
+            group.on('remove', function() { map.off('zoomend', draw); });
+            return group;
+        }
+"""
+
+def layer_js(var_name, name, payload):
+    """JavaScript that declares a hexbin layer and adds it to the map"""
+    return f"""
+        var {var_name} = hexbinLayer({json_backend.dumps(payload)}, '{name}', {json_backend.dumps(HEX_COLORS)}).addTo(map);
+        """
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON backend for the map generators
+Uses orjson when it is installed and the standard library otherwise.
+Every backend writes the same compact text, so generated pages are
+byte-identical whichever one is active. Run this file to benchmark the
+available backends on RAW DOWNLOADS and check that their output matches.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
+
+def _std_loads(s):
+    return json.loads(s)
+
+def _std_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+# orjson writes floats below 1e-4 in fixed notation and drops the '+' from
+# exponents, where the standard library writes 1e-05 / 1e+16. Those number
+# tokens are rewritten with repr(); everything else orjson emits already
+# matches the standard library byte for byte. Candidates are located with
+# plain substring searches, which stay fast on coordinate-heavy output.
+_ORJSON_EXPONENT = re.compile(rb'e[-\d]')
+_ORJSON_NUMBER = re.compile(rb'-?\d+(?:\.\d+)?(?:e[-+]?\d+)?(?=[,\]}])')
+
+def _orjson_candidates(out):
+    """Positions of every 'e<digit|->' and '0.0000' in orjson output, in order"""
+    found = [m.start() for m in _ORJSON_EXPONENT.finditer(out)]
+    i = out.find(b'0.0000')
+    while i >= 0:
+        found.append(i)
+        i = out.find(b'0.0000', i + 6)
+    return sorted(found)
+
+def _orjson_loads(s):
+    try:
+        return orjson.loads(s)
+    except orjson.JSONDecodeError:
+        # NaN/Infinity literals and other stdlib-only extensions
+        return json.loads(s)
+
+def _orjson_dumps(obj):
+    if not isinstance(obj, (dict, list)):
+        return _std_dumps(obj)
+    try:
+        out = orjson.dumps(obj)
+    except TypeError:
+        # Integers over 64 bits, non-str keys, ...
+        return _std_dumps(obj)
+    candidates = _orjson_candidates(out)
+    if not candidates:
+        return out.decode('utf-8')
+    if b'\\' in out:
+        # Escaped quotes would break the quote counting below
+        return _std_dumps(obj)
+
+    pieces = []
+    last = 0        # output copied up to here
+    scanned = 0     # quotes counted up to here
+    quotes = 0
+    for pos in candidates:
+        if pos < last:
+            continue
+        start = max(out.rfind(b',', last, pos), out.rfind(b':', last, pos), out.rfind(b'[', last, pos)) + 1
+        if start <= last:
+            continue
+        m = _ORJSON_NUMBER.match(out, start)
+        if not m or m.end() <= pos:
+            continue
+        # A token is a real number only when an even number of quotes precede it
+        quotes += out.count(b'"', scanned, start)
+        scanned = start
+        if quotes % 2:
+            continue
+        pieces.append(out[last:start])
+        pieces.append(repr(float(m.group())).encode('ascii'))
+        last = m.end()
+    pieces.append(out[last:])
+    return b''.join(pieces).decode('utf-8')
+
+BACKENDS = {'json': (_std_loads, _std_dumps)}
+if orjson is not None:
+    BACKENDS['orjson'] = (_orjson_loads, _orjson_dumps)
+
+# Fastest installed backend unless JSON_BACKEND names another one
+BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if orjson is not None else 'json')
+if BACKEND not in BACKENDS:
+    print(f"[!] JSON backend '{BACKEND}' not available, using json")
+    BACKEND = 'json'
+
+def use(name):
+    """Switch the active backend"""
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    BACKEND = name
+
+def loads(s):
+    """Parse JSON text (str or bytes)"""
+    return BACKENDS[BACKEND][0](s)
+
+def dumps(obj):
+    """Serialize to compact JSON text; non-ASCII characters are kept as-is
+
+    NaN and Infinity are not valid JSON and are the one exception to identical
+    output: the standard library writes them literally, orjson writes null.
+    """
+    return BACKENDS[BACKEND][1](obj)
+
+def load(f):
+    """Parse JSON from an open file"""
+    return loads(f.read())
+
+def dump(obj, f):
+    """Serialize to an open text file"""
+    f.write(dumps(obj))
+
+def benchmark(paths, rounds=3):
+    """Time every backend on the given files and check its output against the standard library"""
+    payloads = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            payloads.append(f.read())
+    total_mb = sum(len(p) for p in payloads) / 1024 / 1024
+    print(f"[+] {len(payloads)} files, {total_mb:.1f} MB")
+
+    reference = [_std_loads(p) for p in payloads]
+    reference_text = [_std_dumps(d) for d in reference]
+    results = {}
+
+    for name, (be_loads, be_dumps) in BACKENDS.items():
+        parse = encode = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            parsed = [be_loads(p) for p in payloads]
+            parse = min(parse, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            texts = [be_dumps(d) for d in reference]
+            encode = min(encode, time.perf_counter() - start)
+
+        mismatches = [paths[i] for i in range(len(paths))
+                      if parsed[i] != reference[i] or texts[i] != reference_text[i]]
+        results[name] = (parse, encode, mismatches)
+
+    base_parse, base_encode, _ = results['json']
+    for name, (parse, encode, mismatches) in results.items():
+        print(f"\n  {name}")
+        print(f"    parse:  {parse*1000:8.1f} ms  ({base_parse/parse:.1f}x)")
+        print(f"    encode: {encode*1000:8.1f} ms  ({base_encode/encode:.1f}x)")
+        if mismatches:
+            print(f"    [!] {len(mismatches)} file(s) differ from json:")
+            for path in mismatches:
+                print(f"        {os.path.basename(path)}")
+        else:
+            print(f"    output identical to json")
+
+    return all(not m for _, _, m in results.values())
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("JSON BACKEND BENCHMARK")
+    print("=" * 60)
+    print(f"[+] Active backend: {BACKEND}")
+
+    paths = []
+    for root, dirs, files in os.walk(RAW_DIR):
+        for name in sorted(files):
+            if name.lower().endswith('.json'):
+                path = os.path.join(root, name)
+                try:
+                    with open(path, 'rb') as f:
+                        json.loads(f.read())
+                except ValueError:
+                    continue
+                paths.append(path)
+
+    if not benchmark(paths):
+        sys.exit(1)
@@ -0,0 +1,279 @@
+"""
+Off-main-thread layer loading for generated pages
+Layer payloads are written next to the page and fetched, parsed and packed
+into typed arrays by a Web Worker. The page adds each layer as soon as its
+buffers arrive, a chunk of features per animation frame, and only keeps the
+features near the current view on the map.
+
+Payloads are named by their content hash, so every build that changes a
+layer leaves the old file behind; prune_layers() deletes the ones no page
+refers to any more.
+"""
+
+import hashlib
+import os
+import re
+
+import json_backend
+import spatial_index
+
+# Runs inside the worker: fetch a FeatureCollection and flatten its geometry.
+# types: one code per feature (0 none, 1 Point, 2 LineString, 3 MultiLineString, 4 Polygon)
+# featureParts[i]..featureParts[i+1]: the feature's parts (rings/paths)
+# parts[j]..parts[j+1]: the part's points; coords holds lat, lng pairs
+WORKER_JS = """
+function fetchJSON(url) {
+    return fetch(url).then(function(r) {
+        if (!r.ok) throw new Error(r.status + ' ' + r.statusText);
+        return r.json();
+    });
+}
+
+// Patch a base edition with a delta (see edition_delta.py)
+function applyDelta(base, delta) {
+    var removed = {}, modified = {}, features = [];
+    delta.removed.forEach(function(i) { removed[i] = true; });
+    delta.modified.forEach(function(m) { modified[m[0]] = m[1]; });
+    base.features.forEach(function(f, i) {
+        if (removed[i]) return;
+        var patch = modified[i];
+        if (patch) {
+            f = {
+                type: 'Feature',
+                properties: 'properties' in patch ? patch.properties : f.properties,
+                geometry: 'geometry' in patch ? patch.geometry : f.geometry
+            };
+        }
+        features.push(f);
+    });
+    // A delta that moves geometry carries the new index, or none when nothing is left to index
+    var moved = delta.removed.length || delta.added.length ||
+        delta.modified.some(function(m) { return 'geometry' in m[1]; });
+    return {type: 'FeatureCollection', features: features.concat(delta.added), index: moved ? delta.index : base.index};
+}
+
+self.onmessage = function(e) {
+    var id = e.data.id;
+    var loaded = e.data.base
+        ? Promise.all([fetchJSON(e.data.base), fetchJSON(e.data.url)]).then(function(r) { return applyDelta(r[0], r[1]); })
+        : fetchJSON(e.data.url);
+    loaded.then(function(fc) {
+        var codes = {Point: 1, LineString: 2, MultiLineString: 3, Polygon: 4};
+        var features = fc.features || [];
+        var nParts = 0, nPoints = 0;
+        features.forEach(function(f) {
+            var g = f.geometry, t = g ? codes[g.type] : 0;
+            if (t === 1) { nParts += 1; nPoints += 1; }
+            else if (t === 2) { nParts += 1; nPoints += g.coordinates.length; }
+            else if (t) { g.coordinates.forEach(function(p) { nParts += 1; nPoints += p.length; }); }
+        });
+
+        var types = new Uint8Array(features.length);
+        var featureParts = new Uint32Array(features.length + 1);
+        var parts = new Uint32Array(nParts + 1);
+        var coords = new Float64Array(nPoints * 2);
+        var props = new Array(features.length);
+        var part = 0, point = 0;
+        function addPart(points) {
+            parts[part++] = point;
+            for (var k = 0; k < points.length; k++) {
+                coords[2 * point] = points[k][1];
+                coords[2 * point + 1] = points[k][0];
+                point++;
+            }
+        }
+        features.forEach(function(f, i) {
+            var g = f.geometry, t = g ? (codes[g.type] || 0) : 0;
+            types[i] = t;
+            featureParts[i] = part;
+            props[i] = f.properties || {};
+            if (t === 1) addPart([g.coordinates]);
+            else if (t === 2) addPart(g.coordinates);
+            else if (t) g.coordinates.forEach(addPart);
+        });
+        featureParts[features.length] = part;
+        parts[part] = point;
+
+        var msg = {id: id, types: types, featureParts: featureParts, parts: parts, coords: coords, props: props};
+        var transfer = [types.buffer, featureParts.buffer, parts.buffer, coords.buffer];
+        if (fc.index) {
+            msg.index = {
+                nodeSize: fc.index.nodeSize,
+                levelBounds: fc.index.levelBounds,
+                boxes: new Float64Array(fc.index.boxes),
+                ids: new Uint32Array(fc.index.ids)
+            };
+            transfer.push(msg.index.boxes.buffer, msg.index.ids.buffer);
+        }
+        self.postMessage(msg, transfer);
+    }).catch(function(err) {
+        self.postMessage({id: id, error: String(err)});
+    });
+};
+"""
+
+# Runs on the page: workerLayer(source, options) returns an empty feature group
+# at once and fills it when the worker is done. source is a payload URL or
+# {base: url, delta: url} for a layer stored as an edition delta. Once on the map it holds only
+# the features whose boxes (from the payload's spatial index) intersect the
+# padded view, updated on every moveend. options.style(props),
+# options.point(latlng, props) (default L.marker) and options.popup(props)
+# shape each feature.
+LOADER_JS = """
+        var decodeLayer = (function() {
+            var worker = new Worker(URL.createObjectURL(new Blob([%(worker)s], {type: 'application/javascript'})));
+            var pending = {}, nextId = 0;
+            worker.onmessage = function(e) {
+                var done = pending[e.data.id];
+                delete pending[e.data.id];
+                done(e.data);
+            };
+            function resolve(url) { return new URL(url, location.href).href; }
+            return function(source, done) {
+                var id = nextId++;
+                pending[id] = done;
+                if (typeof source === 'string') worker.postMessage({id: id, url: resolve(source)});
+                else worker.postMessage({id: id, url: resolve(source.delta), base: resolve(source.base)});
+            };
+        })();
+
+        function searchIndex(index, minX, minY, maxX, maxY) {
+            var results = [], queue = [index.ids.length - 1];
+            var numItems = index.levelBounds[0], boxes = index.boxes;
+            while (queue.length) {
+                var node = queue.pop(), level = 0;
+                while (index.levelBounds[level] <= node) level++;
+                var end = Math.min(node + index.nodeSize, index.levelBounds[level]);
+                for (var pos = node; pos < end; pos++) {
+                    if (boxes[4 * pos] > maxX || boxes[4 * pos + 1] > maxY ||
+                        boxes[4 * pos + 2] < minX || boxes[4 * pos + 3] < minY) continue;
+                    if (pos < numItems) results.push(index.ids[pos]);
+                    else queue.push(index.ids[pos]);
+                }
+            }
+            return results;
+        }
+
+        function workerLayer(source, options) {
+            var group = L.featureGroup();
+            var map = null, data = null;
+            var built = {}, shown = {}, generation = 0;
+            function latlngs(f) {
+                var rings = [];
+                for (var j = data.featureParts[f]; j < data.featureParts[f + 1]; j++) {
+                    var ring = [];
+                    for (var k = data.parts[j]; k < data.parts[j + 1]; k++) {
+                        ring.push([data.coords[2 * k], data.coords[2 * k + 1]]);
+                    }
+                    rings.push(ring);
+                }
+                return rings;
+            }
+            function build(f) {
+                var t = data.types[f], props = data.props[f], layer;
+                if (t === 0) return null;
+                var rings = latlngs(f);
+                if (t === 1) layer = options.point ? options.point(L.latLng(rings[0][0]), props) : L.marker(rings[0][0]);
+                else if (t === 4) layer = L.polygon(rings, options.style(props));
+                else layer = L.polyline(t === 2 ? rings[0] : rings, options.style(props));
+                layer.feature = {properties: props};
+                layer.bindPopup(function() { return options.popup(props); });
+                return layer;
+            }
+            // Keep only the features whose boxes touch the padded view on the map
+            function update() {
+                if (!map || !data) return;
+                var visible;
+                if (data.index) {
+                    var b = map.getBounds();
+                    var padX = (b.getEast() - b.getWest()) / 4, padY = (b.getNorth() - b.getSouth()) / 4;
+                    visible = searchIndex(data.index, b.getWest() - padX, b.getSouth() - padY,
+                                          b.getEast() + padX, b.getNorth() + padY);
+                } else {
+                    visible = [];
+                    for (var f = 0; f < data.types.length; f++) visible.push(f);
+                }
+                var keep = {};
+                visible.forEach(function(f) { keep[f] = true; });
+                Object.keys(shown).forEach(function(f) {
+                    if (!keep[f]) {
+                        group.removeLayer(built[f]);
+                        delete shown[f];
+                    }
+                });
+                var queue = visible.filter(function(f) { return !shown[f]; });
+                var gen = ++generation, i = 0;
+                function chunk() {
+                    if (gen !== generation) return;
+                    var end = Math.min(i + 500, queue.length);
+                    for (; i < end; i++) {
+                        var f = queue[i];
+                        if (!(f in built)) built[f] = build(f);
+                        if (built[f]) {
+                            group.addLayer(built[f]);
+                            shown[f] = true;
+                        }
+                    }
+                    if (i < queue.length) requestAnimationFrame(chunk);
+                }
+                chunk();
+            }
+            group.on('add', function() { map = group._map; map.on('moveend', update); update(); });
+            group.on('remove', function() { map.off('moveend', update); });
+            decodeLayer(source, function(result) {
+                if (result.error) {
+                    console.error('Failed to load ' + JSON.stringify(source) + ': ' + result.error);
+                    return;
+                }
+                data = result;
+                update();
+            });
+            return group;
+        }
+"""
+
+def loader_js():
+    """Page code defining workerLayer(), with the worker source inlined as a Blob"""
+    return LOADER_JS % {'worker': json_backend.dumps(WORKER_JS)}
+
+def write_layer(out_dir, geojson):
+    """Write a layer payload, with its spatial index, under out_dir/layers,
+    named by its content hash
+
+    Returns the URL relative to the page. Identical layers on different pages
+    share one file, so the browser fetches and caches it once.
+    """
+    return write_payload(out_dir, json_backend.dumps(spatial_index.add_index(geojson)))
+
+def write_payload(out_dir, text):
+    """Write serialized payload text under out_dir/layers, named by its content hash"""
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+    relpath = f"layers/{digest}.json"
+    outpath = os.path.join(out_dir, 'layers', f"{digest}.json")
+    if not os.path.exists(outpath):
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+        with open(outpath, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return relpath
+
+PAYLOAD_REF = re.compile(r'layers/([0-9a-f]{16})\.json')
+
+def prune_layers(out_dir):
+    """Delete every payload under out_dir/layers that no page in out_dir refers to"""
+    layers_dir = os.path.join(out_dir, 'layers')
+    if not os.path.isdir(layers_dir):
+        return 0
+    referenced = set()
+    for name in os.listdir(out_dir):
+        if name.endswith('.html'):
+            with open(os.path.join(out_dir, name), 'r', encoding='utf-8') as f:
+                referenced.update(PAYLOAD_REF.findall(f.read()))
+
+    removed = 0
+    for name in os.listdir(layers_dir):
+        if name.endswith('.json') and name[:-5] not in referenced:
+            os.remove(os.path.join(layers_dir, name))
+            removed += 1
+    if removed:
+        print(f"[+] Removed {removed} layer payloads no page uses")
+    return removed
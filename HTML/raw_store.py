@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for RAW DOWNLOADS
+Hashes every raw layer file, keeps each unique payload once and records
+an alias table from the original file names to their hashes
+
+Objects are hard links to the first raw file with that payload, so the store
+itself costs no disk space (it falls back to copies where links are not
+supported). Rewriting that raw file in place also rewrites the object, so the
+stat of every object is recorded at ingest: an object whose stat no longer
+matches is never read, and the next ingest stores it again from a raw file
+that still has the payload.
+
+With --link-duplicates, byte-identical duplicates in RAW DOWNLOADS are also
+replaced by links to their object, which is what actually shrinks disk use.
+Those files share their contents with each other: re-download them by
+writing a new file and renaming it over the old one, not in place.
+"""
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import json_backend
+
+RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
+STORE_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW STORE"
+
+OBJECTS_DIR = os.path.join(STORE_DIR, "objects")
+ALIASES_FILE = os.path.join(STORE_DIR, "aliases.json")
+OBJECTS_FILE = os.path.join(STORE_DIR, "objects.json")
+
+_aliases = None
+_objects = None
+
+def canonical_json(data):
+    """Sorted-key compact JSON of a parsed payload, so copies that only differ
+    in formatting hash the same"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def read_file(filepath):
+    """Return (SHA-256 of the canonical payload, parsed payload) with one read and one parse
+
+    Files that are not valid JSON are hashed as they are and have no payload.
+    """
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json_backend.loads(raw)
+    except ValueError:
+        return hashlib.sha256(raw).hexdigest(), None
+    return hashlib.sha256(canonical_json(data)).hexdigest(), data
+
+def hash_file(filepath):
+    """Return the SHA-256 of a raw file's canonical payload"""
+    return read_file(filepath)[0]
+
+def store_object(filepath, target):
+    """Put a raw file into the store as a hard link, or a copy where linking fails"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(filepath, target)
+    except OSError:
+        shutil.copyfile(filepath, target)
+
+def link_duplicate(filepath, target):
+    """Replace a byte-identical raw file with a hard link to its object; returns True if replaced"""
+    if os.path.samefile(filepath, target) or not filecmp.cmp(filepath, target, shallow=False):
+        return False
+    temp = filepath + '.link'
+    try:
+        os.link(target, temp)
+    except OSError:
+        return False
+    os.replace(temp, filepath)
+    return True
+
+def object_stat(target):
+    """What has to stay the same for a stored object to still hold its payload"""
+    st = os.stat(target)
+    return {'ino': st.st_ino, 'size': st.st_size, 'mtime': st.st_mtime}
+
+def object_intact(digest, objects):
+    """True if the object exists and is unchanged since it was recorded in objects"""
+    target = object_path(digest)
+    return digest in objects and os.path.exists(target) and object_stat(target) == objects[digest]
+
+def object_path(digest):
+    """Path of a stored payload, fanned out by the first two hex digits"""
+    return os.path.join(OBJECTS_DIR, digest[:2], f"{digest}.json")
+
+def alias_name(filepath):
+    """Alias table key for a raw file: its path relative to RAW_DIR with forward slashes"""
+    return os.path.relpath(filepath, RAW_DIR).replace(os.sep, '/')
+
+def load_aliases():
+    """Load the alias table ({name: {sha256, size, mtime}}), empty if not ingested yet"""
+    global _aliases
+    if _aliases is None:
+        if os.path.exists(ALIASES_FILE):
+            with open(ALIASES_FILE, 'r', encoding='utf-8') as f:
+                _aliases = json.load(f)
+        else:
+            _aliases = {}
+    return _aliases
+
+def load_objects():
+    """Load the object table ({sha256: {ino, size, mtime}}), empty if not ingested yet"""
+    global _objects
+    if _objects is None:
+        if os.path.exists(OBJECTS_FILE):
+            with open(OBJECTS_FILE, 'r', encoding='utf-8') as f:
+                _objects = json.load(f)
+        else:
+            _objects = {}
+    return _objects
+
+def raw_files():
+    """All raw JSON files under RAW_DIR, in a stable order"""
+    found = []
+    for root, dirs, files in os.walk(RAW_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.json'):
+                found.append(os.path.join(root, name))
+    return found
+
+def ingest(link_duplicates=False):
+    """Hash every raw file and store each unique payload once
+
+    Files unchanged since the last ingest are only stat()ed, so running this
+    before every build is cheap.
+    """
+    old = load_aliases()
+    old_objects = load_objects()
+    aliases = {}
+    objects = {}
+    stored = set()
+    restored = 0
+    linked = 0
+    total_bytes = 0
+    stored_bytes = 0
+
+    for filepath in raw_files():
+        name = alias_name(filepath)
+        st = os.stat(filepath)
+        entry = old.get(name)
+
+        # Unchanged files keep their hash without being re-read
+        if not (entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime):
+            entry = {'sha256': hash_file(filepath), 'size': st.st_size, 'mtime': st.st_mtime}
+        aliases[name] = entry
+        total_bytes += st.st_size
+
+        digest = entry['sha256']
+        target = object_path(digest)
+        if digest in stored:
+            if link_duplicates and link_duplicate(filepath, target):
+                linked += 1
+                st = os.stat(filepath)
+                aliases[name] = {'sha256': digest, 'size': st.st_size, 'mtime': st.st_mtime}
+            continue
+        stored.add(digest)
+        stored_bytes += st.st_size
+
+        if not object_intact(digest, old_objects):
+            # New, or its raw file was rewritten in place since it was stored
+            if os.path.exists(target):
+                os.remove(target)
+                restored += 1
+            store_object(filepath, target)
+        objects[digest] = object_stat(target)
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(ALIASES_FILE, 'w', encoding='utf-8') as f:
+        json.dump(aliases, f, indent=1, sort_keys=True)
+    with open(OBJECTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(objects, f, indent=1, sort_keys=True)
+
+    global _aliases, _objects
+    _aliases = aliases
+    _objects = objects
+
+    print(f"[+] Ingested {len(aliases)} raw files -> {len(stored)} unique payloads")
+    print(f"[+] Raw size: {total_bytes/1024/1024:.1f} MB, unique: {stored_bytes/1024/1024:.1f} MB")
+    if restored:
+        print(f"[!] Stored {restored} changed objects again")
+    if link_duplicates:
+        print(f"[+] Replaced {linked} duplicate raw files with links")
+    return aliases
+
+def lookup(filepath):
+    """Return (digest, path to read, parsed payload or None) for a raw file
+
+    Files in the alias table whose object is intact are not read at all.
+    Files that are missing from it, have changed since the last ingest or
+    whose object has changed are read and parsed once here, and the parsed
+    payload is handed back so callers need not parse again.
+    """
+    entry = load_aliases().get(alias_name(filepath))
+    if entry:
+        st = os.stat(filepath)
+        if entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+            if object_intact(entry['sha256'], load_objects()):
+                return entry['sha256'], object_path(entry['sha256']), None
+    digest, data = read_file(filepath)
+    return digest, filepath, data
+
+def resolve(filepath):
+    """Return (digest, path to read) for a raw file, preferring the stored object"""
+    digest, source, data = lookup(filepath)
+    return digest, source
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("INGESTING RAW DOWNLOADS INTO CONTENT-ADDRESSED STORE")
+    print("=" * 60)
+
+    aliases = ingest(link_duplicates='--link-duplicates' in sys.argv)
+
+    if '--list' in sys.argv:
+        groups = {}
+        for name, entry in aliases.items():
+            groups.setdefault(entry['sha256'], []).append(name)
+        for digest, names in sorted(groups.items()):
+            if len(names) > 1:
+                print(f"\n{digest[:12]}")
+                for name in names:
+                    print(f"  {name}")
@@ -0,0 +1,162 @@
+"""
+Per-feature bounding boxes and a packed static R-tree per layer
+The index ships inside the layer payload so the page can add only the
+features that intersect the current view.
+
+Index layout (same scheme as flatbush):
+  boxes        flat [minLng, minLat, maxLng, maxLat] per node; the first
+               numItems nodes are the feature boxes in Hilbert order,
+               followed by each parent level up to the root
+  ids          for a leaf node the feature's position in 'features',
+               for a parent node the position of its first child
+  levelBounds  end position (exclusive) of each level, leaves first
+"""
+
+import math
+
+NODE_SIZE = 16
+
+HILBERT_MAX = (1 << 16) - 1
+
+def _walk_coords(coords):
+    """Yield every [x, y] position in a nested GeoJSON coordinates array"""
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords
+        return
+    for c in coords:
+        yield from _walk_coords(c)
+
+def geometry_bbox(geom):
+    """[minLng, minLat, maxLng, maxLat] of a GeoJSON geometry, None if it has no positions"""
+    xs = []
+    ys = []
+    for p in _walk_coords(geom.get('coordinates') or []):
+        xs.append(p[0])
+        ys.append(p[1])
+    if not xs:
+        return None
+    # Rounded outwards so the shorter numbers still contain the geometry
+    return [math.floor(min(xs) * 1e6) / 1e6, math.floor(min(ys) * 1e6) / 1e6,
+            math.ceil(max(xs) * 1e6) / 1e6, math.ceil(max(ys) * 1e6) / 1e6]
+
+def _hilbert(x, y):
+    """Position of (x, y) on a 16-bit Hilbert curve"""
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C ^= (a & (c >> 2)) ^ (b & (d >> 2))
+    D ^= (b & (c >> 2)) ^ ((a ^ b) & (d >> 2))
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C ^= (a & (c >> 4)) ^ (b & (d >> 4))
+    D ^= (b & (c >> 4)) ^ ((a ^ b) & (d >> 4))
+
+    a, b, c, d = A, B, C, D
+    C ^= (a & (c >> 8)) ^ (b & (d >> 8))
+    D ^= (b & (c >> 8)) ^ ((a ^ b) & (d >> 8))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    i0 = (i0 | (i0 << 8)) & 0x00FF00FF
+    i0 = (i0 | (i0 << 4)) & 0x0F0F0F0F
+    i0 = (i0 | (i0 << 2)) & 0x33333333
+    i0 = (i0 | (i0 << 1)) & 0x55555555
+
+    i1 = (i1 | (i1 << 8)) & 0x00FF00FF
+    i1 = (i1 | (i1 << 4)) & 0x0F0F0F0F
+    i1 = (i1 | (i1 << 2)) & 0x33333333
+    i1 = (i1 | (i1 << 1)) & 0x55555555
+
+    return (i1 << 1) | i0
+
+def build_index(items, node_size=NODE_SIZE):
+    """Pack (feature position, bbox) pairs into a static R-tree"""
+    if not items:
+        return None
+
+    min_x = min(b[0] for _, b in items)
+    min_y = min(b[1] for _, b in items)
+    width = (max(b[2] for _, b in items) - min_x) or 1
+    height = (max(b[3] for _, b in items) - min_y) or 1
+
+    def curve(item):
+        b = item[1]
+        x = int(HILBERT_MAX * ((b[0] + b[2]) / 2 - min_x) / width)
+        y = int(HILBERT_MAX * ((b[1] + b[3]) / 2 - min_y) / height)
+        return _hilbert(x, y)
+
+    leaves = sorted(items, key=curve)
+    boxes = [b for _, b in leaves]
+    ids = [i for i, _ in leaves]
+    level_bounds = [len(boxes)]
+
+    start = 0
+    while level_bounds[-1] - start > 1:
+        end = level_bounds[-1]
+        for pos in range(start, end, node_size):
+            children = boxes[pos:min(pos + node_size, end)]
+            boxes.append([min(b[0] for b in children), min(b[1] for b in children),
+                          max(b[2] for b in children), max(b[3] for b in children)])
+            ids.append(pos)
+        start = end
+        level_bounds.append(len(boxes))
+
+    return {
+        'nodeSize': node_size,
+        'levelBounds': level_bounds,
+        'boxes': [v for b in boxes for v in b],
+        'ids': ids,
+    }
+
+def add_index(geojson):
+    """Copy of a FeatureCollection with its bbox index attached as 'index'"""
+    items = []
+    for i, feat in enumerate(geojson.get('features', [])):
+        geom = feat.get('geometry')
+        bbox = geometry_bbox(geom) if geom else None
+        if bbox:
+            items.append((i, bbox))
+    indexed = dict(geojson)
+    index = build_index(items)
+    if index:
+        indexed['index'] = index
+    return indexed
+
+def search(index, min_x, min_y, max_x, max_y):
+    """Feature positions whose boxes intersect the query box (mirrors the page code)"""
+    node_size = index['nodeSize']
+    bounds = index['levelBounds']
+    boxes = index['boxes']
+    ids = index['ids']
+    num_items = bounds[0]
+
+    results = []
+    queue = [len(ids) - 1]
+    while queue:
+        node = queue.pop()
+        end = min(node + node_size, next(b for b in bounds if b > node))
+        for pos in range(node, end):
+            if (boxes[4 * pos] > max_x or boxes[4 * pos + 1] > max_y or
+                    boxes[4 * pos + 2] < min_x or boxes[4 * pos + 3] < min_y):
+                continue
+            if pos < num_items:
+                results.append(ids[pos])
+            else:
+                queue.append(ids[pos])
+    return results
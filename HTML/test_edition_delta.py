@@ -0,0 +1,87 @@
+"""
+Applying a delta to its base must give back the edition's features, in any order
+"""
+
+import collections
+import json
+import random
+
+import pytest
+
+import edition_delta
+import spatial_index
+
+def random_feature(rng, oid):
+    kind = rng.choice(['Point', 'Polygon', None])
+    x, y = round(rng.uniform(-80, -66), 4), round(rng.uniform(-5, 13), 4)
+    if kind == 'Point':
+        geometry = {'type': 'Point', 'coordinates': [x, y]}
+    elif kind == 'Polygon':
+        geometry = {'type': 'Polygon', 'coordinates': [[[x, y], [x + 1, y], [x, y + 1], [x, y]]]}
+    else:
+        geometry = None
+    props = {'OBJECTID': oid, 'v': rng.randint(0, 3)} if rng.random() < 0.8 else {'v': rng.randint(0, 3)}
+    return {'type': 'Feature', 'properties': props, 'geometry': geometry}
+
+def random_edition(rng, base, next_id):
+    """Drop, edit, duplicate and add features of base, then shuffle them"""
+    features = []
+    for feat in base['features']:
+        roll = rng.random()
+        if roll < 0.2:
+            continue
+        feat = json.loads(json.dumps(feat))
+        if roll < 0.35:
+            feat['properties']['v'] = rng.randint(4, 9)
+        elif roll < 0.5:
+            feat['geometry'] = random_feature(rng, 0)['geometry']
+        elif roll < 0.55:
+            features.append(json.loads(json.dumps(feat)))
+        features.append(feat)
+    features += [random_feature(rng, next_id + i) for i in range(rng.randint(0, 10))]
+    rng.shuffle(features)
+    return {'type': 'FeatureCollection', 'features': features}
+
+def multiset(geojson):
+    return collections.Counter(json.dumps(f, sort_keys=True) for f in geojson['features'])
+
+def check_round_trip(base, edition):
+    delta = edition_delta.diff(base, edition)
+    patched = edition_delta.apply(base, delta)
+    assert multiset(patched) == multiset(edition)
+    if 'index' in delta:
+        assert delta['index'] == spatial_index.add_index(patched)['index']
+    return delta
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_editions(seed):
+    rng = random.Random(seed)
+    base = {'type': 'FeatureCollection', 'features': [random_feature(rng, i) for i in range(rng.randint(0, 60))]}
+    check_round_trip(base, random_edition(rng, base, 1000))
+
+def test_empty_editions():
+    rng = random.Random(1)
+    empty = {'type': 'FeatureCollection', 'features': []}
+    base = {'type': 'FeatureCollection', 'features': [random_feature(rng, i) for i in range(20)]}
+    assert 'index' not in check_round_trip(base, empty)
+    check_round_trip(empty, base)
+    assert check_round_trip(empty, empty) == {'removed': [], 'modified': [], 'added': []}
+
+def test_edition_without_positions_has_no_index():
+    base = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'OBJECTID': 1}, 'geometry': {'type': 'Point', 'coordinates': [-74.1, 4.6]}},
+        {'type': 'Feature', 'properties': {'OBJECTID': 2}, 'geometry': None},
+    ]}
+    edition = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'OBJECTID': 2}, 'geometry': None},
+        {'type': 'Feature', 'properties': {'OBJECTID': 3}, 'geometry': None},
+    ]}
+    delta = check_round_trip(base, edition)
+    assert edition_delta.geometry_moved(delta) and 'index' not in delta
+
+def test_unchanged_edition_keeps_base_index():
+    rng = random.Random(2)
+    base = {'type': 'FeatureCollection', 'features': [random_feature(rng, i) for i in range(30)]}
+    edition = {'type': 'FeatureCollection', 'features': list(reversed(base['features']))}
+    delta = check_round_trip(base, edition)
+    assert delta == {'removed': [], 'modified': [], 'added': []}
@@ -0,0 +1,61 @@
+"""
+The NumPy and pure-Python hex binning paths must put every point in the same cell
+"""
+
+import itertools
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import hexbin
+
+def bin_without_numpy(monkeypatch, coords, size):
+    with monkeypatch.context() as m:
+        m.setattr(hexbin, 'np', None)
+        return hexbin.bin_points(coords, size)
+
+def hex_center(q, r, size):
+    return [size * math.sqrt(3) * (q + r / 2), size * 1.5 * r]
+
+def edge_points(size, span=4):
+    """Hex centres, midpoints between neighbouring centres and hex corners"""
+    points = []
+    for q, r in itertools.product(range(-span, span + 1), repeat=2):
+        cx, cy = hex_center(q, r, size)
+        points.append([cx, cy])
+        for dq, dr in [(1, 0), (0, 1), (-1, 1)]:
+            nx, ny = hex_center(q + dq, r + dr, size)
+            points.append([(cx + nx) / 2, (cy + ny) / 2])
+        for i in range(6):
+            a = math.pi / 180 * (60 * i - 30)
+            points.append([cx + size * math.cos(a), cy + size * math.sin(a)])
+    return points
+
+@pytest.mark.parametrize('size', [s for _, s in hexbin.HEX_RESOLUTIONS] + [1.0])
+def test_random_points_match(monkeypatch, size):
+    rng = random.Random(int(size * 1000))
+    coords = [[rng.uniform(-80, -66), rng.uniform(-5, 13)] for _ in range(5000)]
+    assert hexbin.bin_points(coords, size) == bin_without_numpy(monkeypatch, coords, size)
+
+@pytest.mark.parametrize('size', [0.1, 0.5, 1.0])
+def test_points_on_edges_match(monkeypatch, size):
+    coords = edge_points(size)
+    cells = hexbin.bin_points(coords, size)
+    assert cells == bin_without_numpy(monkeypatch, coords, size)
+    assert sum(c[2] for c in cells) == len(coords)
+
+def test_exact_ties_round_the_same():
+    # Half-integer and third-integer axial positions are exactly on edges and corners
+    steps = [i / 2 for i in range(-8, 9)] + [i / 3 for i in range(-9, 10)]
+    pairs = list(itertools.product(steps, repeat=2))
+    q = np.array([p[0] for p in pairs])
+    r = np.array([p[1] for p in pairs])
+    qi, ri = hexbin._cube_round_np(q, r)
+    assert list(zip(qi.tolist(), ri.tolist())) == [hexbin._cube_round(a, b) for a, b in pairs]
+
+def test_three_dimensional_coordinates(monkeypatch):
+    coords = [[-74.08, 4.61, 2600.0], [-75.57, 6.25, 1495.0], [-74.08, 4.61]]
+    assert hexbin.bin_points(coords, 0.3) == bin_without_numpy(monkeypatch, coords, 0.3)
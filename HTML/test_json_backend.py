@@ -0,0 +1,90 @@
+"""
+Every json_backend backend must write exactly what the standard library writes
+"""
+
+import json
+import math
+import random
+import struct
+
+import pytest
+
+import json_backend
+
+BACKENDS = sorted(json_backend.BACKENDS)
+
+def reference(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+@pytest.fixture(params=BACKENDS)
+def dumps(request):
+    return json_backend.BACKENDS[request.param][1]
+
+@pytest.fixture(params=BACKENDS)
+def loads(request):
+    return json_backend.BACKENDS[request.param][0]
+
+EXPONENT_FLOATS = [
+    1e-05, 1e-07, -2.5e-10, 1e16, -1e16, 1.5e+300, 1e22, 5e-324,
+    1.7976931348623157e308, 2.2250738585072014e-308, 123456789012345678.0,
+]
+
+SMALL_FLOATS = [0.0001, 0.00012, 0.00001, 0.000099, -0.00005, 0.0000123456789, 0.0]
+
+@pytest.mark.parametrize('value', EXPONENT_FLOATS + SMALL_FLOATS)
+def test_float_tokens(dumps, value):
+    for obj in ([value], {'v': value}, [[value, value], {'a': [value]}], [1, value, 'x']):
+        assert dumps(obj) == reference(obj)
+
+@pytest.mark.parametrize('text', [
+    '1e-05', '0.00001', '1e16', 'x,1e-05]', '[0.00001,', 'a:1e-05}', '"', 'e-5', '0.0000',
+])
+def test_number_like_strings(dumps, text):
+    obj = {text: [text, 1e-05, text + '0.00001'], 'n': 0.00001, 'k': text}
+    assert dumps(obj) == reference(obj)
+
+@pytest.mark.parametrize('text', ['say "1e-05"', 'C:\\raw\\0.00001', 'line\nbreak 1e16', '\\"', 'tab\t0.00002'])
+def test_escaped_strings(dumps, text):
+    obj = [text, 1e-05, {text: 0.00001}]
+    assert dumps(obj) == reference(obj)
+
+def test_non_ascii(dumps):
+    obj = {'Municipio': 'Bogotá', 'Observación': 'año 1e-05', 'v': 0.00003}
+    assert dumps(obj) == reference(obj)
+
+def test_non_str_keys(dumps):
+    obj = {1: 1e-05, 2.5: 'x', True: None, None: 0.00001}
+    assert dumps(obj) == reference(obj)
+
+def test_big_ints(dumps):
+    obj = [2 ** 63, -(2 ** 63) - 1, 2 ** 70, {'id': 10 ** 30}, 1e-05]
+    assert dumps(obj) == reference(obj)
+
+@pytest.mark.parametrize('obj', [1e-05, 'text', 42, None, True, 2 ** 70])
+def test_scalars(dumps, obj):
+    assert dumps(obj) == reference(obj)
+
+def test_random_doubles(dumps):
+    rng = random.Random(1234)
+    values = []
+    while len(values) < 20000:
+        # Raw bit patterns cover every exponent, not just a uniform range
+        v = struct.unpack('<d', struct.pack('<Q', rng.getrandbits(64)))[0]
+        if math.isfinite(v):
+            values.append(v)
+    values += [rng.uniform(-80, -66) for _ in range(5000)]
+    obj = {'coordinates': [values[i:i + 2] for i in range(0, len(values), 2)], 's': 'e-5, 0.0000'}
+    assert dumps(obj) == reference(obj)
+
+def test_loads_matches_stdlib(loads):
+    text = reference({'a': [1e-05, 2 ** 70, 'Bogotá', {'b': None}], 'c': 0.00001})
+    assert loads(text) == json.loads(text)
+    assert loads(text.encode('utf-8')) == json.loads(text)
+
+def test_loads_nan_fallback(loads):
+    assert math.isnan(loads('[NaN]')[0])
+
+def test_round_trip_through_active_backend():
+    obj = {'features': [{'geometry': {'coordinates': [-74.0817, 4.6097]}, 'properties': {'v': 1e-05}}]}
+    assert json_backend.loads(json_backend.dumps(obj)) == obj
+    assert json_backend.dumps(obj) == reference(obj)
@@ -0,0 +1,62 @@
+"""
+The packed index must return exactly the features a brute-force bbox scan finds
+"""
+
+import random
+
+import pytest
+
+import spatial_index
+
+def random_layer(rng, n):
+    features = []
+    for i in range(n):
+        kind = rng.choice(['Point', 'Polygon', 'MultiLineString', None])
+        x, y = rng.uniform(-80, -66), rng.uniform(-5, 13)
+        if kind == 'Point':
+            geometry = {'type': 'Point', 'coordinates': [x, y]}
+        elif kind == 'Polygon':
+            ring = [[x + rng.uniform(0, 2), y + rng.uniform(0, 2)] for _ in range(5)]
+            geometry = {'type': 'Polygon', 'coordinates': [ring + ring[:1]]}
+        elif kind == 'MultiLineString':
+            geometry = {'type': 'MultiLineString',
+                        'coordinates': [[[x + rng.uniform(0, 1), y + rng.uniform(0, 1)] for _ in range(3)]
+                                        for _ in range(2)]}
+        else:
+            geometry = None
+        features.append({'type': 'Feature', 'properties': {'i': i}, 'geometry': geometry})
+    return {'type': 'FeatureCollection', 'features': features}
+
+def brute_force(geojson, min_x, min_y, max_x, max_y):
+    found = []
+    for i, feat in enumerate(geojson['features']):
+        bbox = spatial_index.geometry_bbox(feat['geometry']) if feat['geometry'] else None
+        if bbox and not (bbox[0] > max_x or bbox[1] > max_y or bbox[2] < min_x or bbox[3] < min_y):
+            found.append(i)
+    return found
+
+@pytest.mark.parametrize('n', [1, 5, 16, 17, 256, 300, 2000])
+def test_search_matches_brute_force(n):
+    rng = random.Random(n)
+    geojson = random_layer(rng, n)
+    index = spatial_index.add_index(geojson)['index']
+    for _ in range(200):
+        x, y = rng.uniform(-82, -64), rng.uniform(-7, 15)
+        w, h = rng.uniform(0, 6), rng.uniform(0, 6)
+        query = (x, y, x + w, y + h)
+        assert sorted(spatial_index.search(index, *query)) == brute_force(geojson, *query)
+
+def test_whole_extent_returns_every_feature():
+    geojson = random_layer(random.Random(7), 500)
+    index = spatial_index.add_index(geojson)['index']
+    expected = [i for i, f in enumerate(geojson['features']) if f['geometry']]
+    assert sorted(spatial_index.search(index, -180, -90, 180, 90)) == expected
+
+def test_bbox_contains_geometry():
+    geom = {'type': 'Polygon', 'coordinates': [[[-74.1234567, 4.7654321], [-73.0000001, 5.0], [-74.1234567, 4.7654321]]]}
+    min_x, min_y, max_x, max_y = spatial_index.geometry_bbox(geom)
+    assert min_x <= -74.1234567 and max_x >= -73.0000001
+    assert min_y <= 4.7654321 and max_y >= 5.0
+
+def test_empty_layer_has_no_index():
+    assert 'index' not in spatial_index.add_index({'type': 'FeatureCollection', 'features': []})
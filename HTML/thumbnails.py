@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Static PNG thumbnails for the map pages
+Rasterizes the converted layers of every map in visualize_all_maps.MAPS and
+of the pages written by convert_maps.py and convert_attacks_map.py with a
+small scanline renderer (no browser, no network, NumPy optional) and adds the
+previews to the cards in maps_index.html. Hand-written pages in STATIC_PAGES
+have no converted layers and keep their cards as they are.
+"""
+
+import math
+import os
+import re
+import struct
+import zlib
+
+import convert_attacks_map
+import convert_maps
+import visualize_all_maps
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
+THUMB_DIR = os.path.join(OUT_DIR, 'thumbs')
+INDEX_PAGE = os.path.join(OUT_DIR, 'maps_index.html')
+
+THUMB_WIDTH = 320
+THUMB_HEIGHT = 200
+
+# Same look as the dark basemap on the pages
+BACKGROUND = '#1b1b1d'
+
+# Department outlines drawn under every thumbnail for context
+BASE_LAYER = 'Mapa_AT_MIL1_layer0'
+BASE_FILL = '#2c2c30'
+BASE_EDGE = '#4a4a50'
+
+# Cards in maps_index.html for pages no script in this folder generates
+STATIC_PAGES = [
+    'violence_statistics_map.html',
+    'coca_cultivation_map.html',
+    'indigenous_reserves_map.html',
+    'protection_routes_map.html',
+]
+
+FILL_OPACITY = 0.5    # fillOpacity of the polygon layers on the pages
+POINT_RADIUS = 2
+
+def hex_rgb(color):
+    """'#rrggbb' -> (r, g, b)"""
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+class Canvas:
+    """RGB raster with span fills, lines and dots"""
+
+    def __init__(self, width, height, background):
+        self.width = width
+        self.height = height
+        r, g, b = hex_rgb(background)
+        if np is not None:
+            self.pixels = np.empty((height, width, 3), dtype=np.int32)
+            self.pixels[:] = (r, g, b)
+        else:
+            self.pixels = [[r, g, b] * width for _ in range(height)]
+
+    def span(self, y, x0, x1, rgb, alpha):
+        """Blend rgb over pixels x0..x1-1 of row y; alpha is 0-255"""
+        x0 = max(x0, 0)
+        x1 = min(x1, self.width)
+        if x0 >= x1 or not 0 <= y < self.height:
+            return
+        if np is not None:
+            row = self.pixels[y, x0:x1]
+            row[:] = (row * (255 - alpha) + np.array(rgb) * alpha + 127) // 255
+            return
+        row = self.pixels[y]
+        for i in range(3 * x0, 3 * x1, 3):
+            for c in range(3):
+                row[i + c] = (row[i + c] * (255 - alpha) + rgb[c] * alpha + 127) // 255
+
+    def pixel(self, x, y, rgb):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if np is not None:
+                self.pixels[y, x] = rgb
+            else:
+                self.pixels[y][3 * x:3 * x + 3] = rgb
+
+    def line(self, x0, y0, x1, y1, rgb):
+        """Bresenham line between two pixel positions"""
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, rgb)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def polygon(self, rings, rgb, alpha):
+        """Even-odd scanline fill of a polygon given as rings of float pixel positions"""
+        # Edge table: each edge adds one crossing to every row centre it spans
+        crossings = {}
+        for ring in rings:
+            for (xa, ya), (xb, yb) in zip(ring, ring[1:] + ring[:1]):
+                if ya == yb:
+                    continue
+                if ya > yb:
+                    xa, ya, xb, yb = xb, yb, xa, ya
+                slope = (xb - xa) / (yb - ya)
+                first = max(math.ceil(ya - 0.5), 0)
+                last = min(math.ceil(yb - 0.5), self.height)
+                for y in range(first, last):
+                    crossings.setdefault(y, []).append(xa + (y + 0.5 - ya) * slope)
+        for y, xs in crossings.items():
+            xs.sort()
+            for i in range(0, len(xs) - 1, 2):
+                self.span(y, int(xs[i] + 0.5), int(xs[i + 1] + 0.5), rgb, alpha)
+
+    def dot(self, cx, cy, radius, rgb):
+        for dy in range(-radius, radius + 1):
+            half = int((radius * radius - dy * dy) ** 0.5 + 0.5)
+            self.span(cy + dy, cx - half, cx + half + 1, rgb, 255)
+
+    def rows(self):
+        """Rows as bytes, top to bottom"""
+        if np is not None:
+            return [bytes(row) for row in self.pixels.astype(np.uint8).reshape(self.height, -1)]
+        return [bytes(row) for row in self.pixels]
+
+def write_png(path, canvas):
+    """Encode an RGB canvas as an 8-bit PNG"""
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    raw = b''.join(b'\x00' + row for row in canvas.rows())
+    header = struct.pack('>IIBBBBB', canvas.width, canvas.height, 8, 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', header))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 9)))
+        f.write(chunk(b'IEND', b''))
+
+def layers_bounds(layers):
+    """[minLng, minLat, maxLng, maxLat] over all layer positions"""
+    xs = []
+    ys = []
+    for geojson, color in layers:
+        for feat in geojson['features']:
+            g = feat['geometry']
+            if g['type'] == 'Point':
+                xs.append(g['coordinates'][0])
+                ys.append(g['coordinates'][1])
+            else:
+                for part in g['coordinates']:
+                    xs += [p[0] for p in part]
+                    ys += [p[1] for p in part]
+    if not xs:
+        return None
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def projection(bounds, width, height, margin=0.05):
+    """lng/lat -> float pixel function fitting bounds into the image, aspect kept"""
+    min_x, min_y, max_x, max_y = bounds
+    span_x = (max_x - min_x) or 1
+    span_y = (max_y - min_y) or 1
+    scale = min(width / span_x, height / span_y) * (1 - 2 * margin)
+    off_x = (width - span_x * scale) / 2
+    off_y = (height - span_y * scale) / 2
+
+    def project(p):
+        return (off_x + (p[0] - min_x) * scale, off_y + (max_y - p[1]) * scale)
+    return project
+
+def draw_layer(canvas, project, geojson, fill, edge, alpha):
+    """Draw a converted layer the way the page styles it"""
+    for feat in geojson['features']:
+        g = feat['geometry']
+        if g['type'] == 'Point':
+            x, y = project(g['coordinates'])
+            canvas.dot(int(x), int(y), POINT_RADIUS, edge)
+            continue
+        paths = [[project(p) for p in part] for part in g['coordinates']]
+        if g['type'] == 'Polygon':
+            canvas.polygon(paths, fill, alpha)
+        for path in paths:
+            for (xa, ya), (xb, yb) in zip(path, path[1:]):
+                canvas.line(int(xa), int(ya), int(xb), int(yb), edge)
+
+def render(layers, path, width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """Rasterize [(geojson, color)] to a PNG thumbnail; returns False if there is nothing to draw"""
+    bounds = layers_bounds(layers)
+    if not bounds:
+        return False
+    project = projection(bounds, width, height)
+    canvas = Canvas(width, height, BACKGROUND)
+
+    base = visualize_all_maps.map_layer_files({'files': {BASE_LAYER: ('Departments', BASE_EDGE)}})
+    if base:
+        geojson = visualize_all_maps.load_arcgis_json(base[0][0])
+        if geojson:
+            draw_layer(canvas, project, geojson, hex_rgb(BASE_FILL), hex_rgb(BASE_EDGE), 255)
+
+    for geojson, color in layers:
+        rgb = hex_rgb(color)
+        draw_layer(canvas, project, geojson, rgb, rgb, int(FILL_OPACITY * 255))
+
+    write_png(path, canvas)
+    return True
+
+def thumbnail_path(filename):
+    return os.path.join(THUMB_DIR, filename.replace('.html', '.png'))
+
+def render_page(filename, layers):
+    """Write the thumbnail of a page from its [(geojson, color)] layers; returns the page name or None"""
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    path = thumbnail_path(filename)
+    if render(layers, path):
+        print(f"[+] Thumbnail: {os.path.basename(path)}")
+        return filename
+    print(f"[!] Nothing to draw for {filename}")
+    return None
+
+def render_map(spec):
+    """Write the thumbnail of one map definition"""
+    layers = []
+    for filepath, name, color in visualize_all_maps.map_layer_files(spec):
+        geojson = visualize_all_maps.load_arcgis_json(filepath)
+        if geojson and geojson['features']:
+            layers.append((geojson, color))
+    return render_page(spec['filename'], layers)
+
+def armed_groups_layers():
+    return [(layer['geojson'], layer['color']) for layer in convert_maps.load_territories().values()]
+
+def attacks_layers():
+    """Departments grouped by their choropleth class"""
+    geojson, stats = convert_attacks_map.load_and_convert_attacks()
+    classes = {}
+    for feat in geojson['features']:
+        color = convert_attacks_map.attack_color(feat['properties']['total'])
+        classes.setdefault(color, []).append(feat)
+    return [({'type': 'FeatureCollection', 'features': features}, color)
+            for color, features in classes.items()]
+
+# Generator scripts -> (page they write, loader for its converted layers)
+SCRIPT_LAYERS = {
+    'convert_maps.py': ('armed_groups_map.html', armed_groups_layers),
+    'convert_attacks_map.py': ('attacks_on_signatories_map.html', attacks_layers),
+}
+
+def render_script(script):
+    """Write the thumbnail of a page written by a generator script"""
+    filename, load = SCRIPT_LAYERS[script]
+    try:
+        layers = load()
+    except OSError as e:
+        print(f"[!] No thumbnail for {filename}: {e}")
+        return None
+    return render_page(filename, layers)
+
+def render_all():
+    """Thumbnails for every generated page; returns the page names rendered"""
+    rendered = [render_map(spec) for spec in visualize_all_maps.MAPS]
+    rendered += [render_script(script) for script in SCRIPT_LAYERS]
+    for filename in STATIC_PAGES:
+        print(f"[!] No thumbnail for {filename}: hand-written page, no converted layers")
+    return [filename for filename in rendered if filename]
+
+def update_index(filenames, index_page=INDEX_PAGE):
+    """Put an <img> preview above the 'Open Map' link of each card that has a thumbnail"""
+    with open(index_page, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    for filename in filenames:
+        src = f"thumbs/{filename.replace('.html', '.png')}"
+        img = (f'<img class="thumb" src="{src}" width="{THUMB_WIDTH}" height="{THUMB_HEIGHT}" '
+               f'loading="lazy" alt="">')
+        link = re.compile(r'(?P<indent>[ \t]*)(?:<img class="thumb"[^>]*>\s*)?'
+                          r'(?P<link><a href="' + re.escape(filename) + r'">)')
+        html, count = link.subn(lambda m: f"{m.group('indent')}{img}\n{m.group('indent')}{m.group('link')}", html)
+        if not count:
+            print(f"[!] No card links to {filename}")
+
+    with open(index_page, 'w', encoding='utf-8') as f:
+        f.write(html)
+    print(f"[+] Updated: {os.path.basename(index_page)}")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("MAP THUMBNAILS")
+    print("=" * 60)
+
+    update_index(render_all())
@@ -4,11 +4,16 @@ Visualize ALL Colombian military/intelligence maps
 Creates multiple interactive HTML maps from downloaded ArcGIS data
 """
 
-import json
 import math
 import os
 import glob
 
+import edition_delta
+import hexbin
+import json_backend
+import layer_worker
+import raw_store
+
 RAW_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\RAW DOWNLOADS"
 OUT_DIR = r"C:\Users\Squir\Desktop\NARCO COUNTER OPS\COLOMBIA\HTML"
 
@@ -30,11 +35,19 @@ def convert_geometry(geom):
         return {"type": "Point", "coordinates": web_mercator_to_wgs84(geom['x'], geom['y'])}
     return None
 
+# Converted layers keyed by payload hash, so duplicate raw files convert once
+_converted = {}
+
 def load_arcgis_json(filepath):
     """Load ArcGIS JSON and convert to GeoJSON"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        digest, source, data = raw_store.lookup(filepath)
+        if digest in _converted:
+            return _converted[digest]
+
+        if data is None:
+            with open(source, 'r', encoding='utf-8') as f:
+                data = json_backend.load(f)
 
         features = []
         for feat in data.get('features', []):
@@ -48,7 +61,8 @@ def load_arcgis_json(filepath):
                         "geometry": converted
                     })
 
-        return {"type": "FeatureCollection", "features": features}
+        _converted[digest] = {"type": "FeatureCollection", "features": features}
+        return _converted[digest]
     except Exception as e:
         print(f"Error loading {filepath}: {e}")
         return None
@@ -66,10 +80,20 @@ def create_map_html(title, subtitle, layers, filename, center=[4.5, -74], zoom=6
         color = data.get('color', '#FF0000')
         geojson = data.get('geojson', {"type": "FeatureCollection", "features": []})
 
-        if geojson and geojson.get('features'):
+        if 'hexbin' in data:
+            layer_js.append(hexbin.layer_js(safe_name, name, data['hexbin']))
+            overlay_items.append(f'"{name}": {safe_name}')
+            legend_items.append(f'<div class="legend-item"><div class="legend-color" style="background:{hexbin.HEX_COLORS[-1]}"></div>{name} ({data["hexbin"]["total"]}, binned)</div>')
+        elif geojson and geojson.get('features'):
+            # Payload ships as a separate file, decoded off the main thread
+            if 'base' in data:
+                source, counts = edition_delta.write_edition(OUT_DIR, data['base'], geojson, data.get('delta'))
+                source = json_backend.dumps(source)
+            else:
+                source = f"'{layer_worker.write_layer(OUT_DIR, geojson)}'"
             layer_js.append(f"""
-        var {safe_name} = L.geoJSON({json.dumps(geojson)}, {{
-            style: function(feature) {{
+        var {safe_name} = workerLayer({source}, {{
+            style: function(props) {{
                 return {{
                     fillColor: '{color}',
                     weight: 2,
@@ -78,7 +102,7 @@ def create_map_html(title, subtitle, layers, filename, center=[4.5, -74], zoom=6
                     fillOpacity: 0.5
                 }};
             }},
-            pointToLayer: function(feature, latlng) {{
+            point: function(latlng, props) {{
                 return L.circleMarker(latlng, {{
                     radius: 8,
                     fillColor: '{color}',
@@ -88,15 +112,14 @@ def create_map_html(title, subtitle, layers, filename, center=[4.5, -74], zoom=6
                     fillOpacity: 0.8
                 }});
             }},
-            onEachFeature: function(feature, layer) {{
-                var props = feature.properties;
+            popup: function(props) {{
                 var popup = '<b>{name}</b><br>';
                 for (var key in props) {{
                     if (props[key] && key !== 'Shape_Length' && key !== 'Shape_Area') {{
                         popup += key + ': ' + props[key] + '<br>';
                     }}
                 }}
-                layer.bindPopup(popup);
+                return popup;
             }}
         }}).addTo(map);
         """)
@@ -160,6 +183,8 @@ def create_map_html(title, subtitle, layers, filename, center=[4.5, -74], zoom=6
             attribution: '&copy; OpenStreetMap &copy; CARTO',
             subdomains: 'abcd', maxZoom: 19
         }}).addTo(map);
+        {layer_worker.loader_js()}
+        {hexbin.HEXBIN_JS if any('hexbin' in d for d in layers.values()) else ''}
         {''.join(layer_js)}
         var overlays = {{ {', '.join(overlay_items)} }};
         L.control.layers(null, overlays, {{collapsed: false}}).addTo(map);
@@ -174,11 +199,14 @@ def create_map_html(title, subtitle, layers, filename, center=[4.5, -74], zoom=6
     return outpath
 
 # ============================================================
-# MAP 1: September 2025 Military Map - All Layers
+# MAP DEFINITIONS
 # ============================================================
-print("\n=== SEPTEMBER 2025 MILITARY MAP ===")
-sep_layers = {}
+# Each layer table maps a raw file prefix to (layer name, color). A prefix
+# matches '<prefix>.json' first, then '<prefix>_*.json'. A map with
+# 'base_files' is a later edition of that table: layers with the same name are
+# stored as deltas over the base edition.
 
+# MAP 1: September 2025 Military Map - All Layers
 sep_files = {
     'CNR_SEP_2025_MIL1_layer9': ('AETCR Camps', '#00FF00'),
     'CNR_SEP_2025_MIL1_layer12': ('ELN', '#FF0000'),
@@ -189,31 +217,7 @@ sep_files = {
     'CNR_SEP_2025_MIL1_layer16': ('ASCN', '#0000FF'),
 }
 
-for prefix, (name, color) in sep_files.items():
-    # Try different filename patterns
-    for pattern in [f'{prefix}.json', f'{prefix}_*.json']:
-        matches = glob.glob(os.path.join(RAW_DIR, pattern))
-        if matches:
-            geojson = load_arcgis_json(matches[0])
-            if geojson and geojson['features']:
-                sep_layers[name] = {'geojson': geojson, 'color': color}
-                print(f"  Loaded: {name} ({len(geojson['features'])} features)")
-            break
-
-if sep_layers:
-    create_map_html(
-        "CNR SEPTEMBER 2025 - MILITARY MAP",
-        "All Armed Group Layers | ergit.presidencia.gov.co",
-        sep_layers,
-        "military_sep2025_full.html"
-    )
-
-# ============================================================
 # MAP 2: July 2025 Military Map
-# ============================================================
-print("\n=== JULY 2025 MILITARY MAP ===")
-jul_layers = {}
-
 jul_files = {
     'CNR_julio_2025_MIL1_layer9': ('AETCR Camps', '#00FF00'),
     'CNR_julio_2025_MIL1_layer12': ('ELN', '#FF0000'),
@@ -224,30 +228,7 @@ jul_files = {
     'CNR_julio_2025_MIL1_layer16': ('ASCN', '#0000FF'),
 }
 
-for prefix, (name, color) in jul_files.items():
-    for pattern in [f'{prefix}.json', f'{prefix}_*.json']:
-        matches = glob.glob(os.path.join(RAW_DIR, pattern))
-        if matches:
-            geojson = load_arcgis_json(matches[0])
-            if geojson and geojson['features']:
-                jul_layers[name] = {'geojson': geojson, 'color': color}
-                print(f"  Loaded: {name} ({len(geojson['features'])} features)")
-            break
-
-if jul_layers:
-    create_map_html(
-        "CNR JULY 2025 - MILITARY MAP",
-        "Armed Group Territories | ergit.presidencia.gov.co",
-        jul_layers,
-        "military_jul2025_full.html"
-    )
-
-# ============================================================
 # MAP 3: Case 03 Military Map
-# ============================================================
-print("\n=== CASE 03 MILITARY MAP ===")
-caso_layers = {}
-
 caso_files = {
     'Mapa_Caso_03_MIL1_layer9': ('AETCR Camps', '#00FF00'),
     'Mapa_Caso_03_MIL1_layer31': ('ELN', '#FF0000'),
@@ -257,99 +238,145 @@ caso_files = {
     'Mapa_Caso_03_MIL1_layer21': ('Firmantes Presence', '#FFFF00'),
 }
 
-for prefix, (name, color) in caso_files.items():
-    for pattern in [f'{prefix}.json', f'{prefix}_*.json']:
-        matches = glob.glob(os.path.join(RAW_DIR, pattern))
-        if matches:
-            geojson = load_arcgis_json(matches[0])
-            if geojson and geojson['features']:
-                caso_layers[name] = {'geojson': geojson, 'color': color}
-                print(f"  Loaded: {name} ({len(geojson['features'])} features)")
-            break
-
-if caso_layers:
-    create_map_html(
-        "CASE 03 MILITARY MAP",
-        "Special Investigation Zones | ergit.presidencia.gov.co",
-        caso_layers,
-        "military_caso03.html"
-    )
-
-# ============================================================
 # MAP 4: AT Zones Map
-# ============================================================
-print("\n=== AT ZONES MAP ===")
-at_layers = {}
-
 at_files = {
     'Mapa_AT_MIL1_layer0': ('Departments', '#3388ff'),
     'Mapa_AT_MIL1_layer1': ('AT Municipalities 2025', '#ff7800'),
     'Mapa_AT_MIL1_layer2': ('PEP Municipalities', '#00ff00'),
 }
 
-for prefix, (name, color) in at_files.items():
-    for pattern in [f'{prefix}.json', f'{prefix}_*.json']:
-        matches = glob.glob(os.path.join(RAW_DIR, pattern))
-        if matches:
-            geojson = load_arcgis_json(matches[0])
-            if geojson and geojson['features']:
-                at_layers[name] = {'geojson': geojson, 'color': color}
-                print(f"  Loaded: {name} ({len(geojson['features'])} features)")
-            break
-
-if at_layers:
-    create_map_html(
-        "AT ZONES MAP",
-        "Administrative Territories | ergit.presidencia.gov.co",
-        at_layers,
-        "at_zones_map.html"
-    )
-
-# ============================================================
 # MAP 5: AETCR Camps Only (Points)
-# ============================================================
-print("\n=== AETCR CAMPS MAP ===")
-aetcr_layers = {}
-
-aetcr_file = os.path.join(RAW_DIR, 'CNR_SEP_2025_MIL1_layer9.json')
-if os.path.exists(aetcr_file):
-    geojson = load_arcgis_json(aetcr_file)
-    if geojson and geojson['features']:
-        aetcr_layers['AETCR Reintegration Camps'] = {'geojson': geojson, 'color': '#00FF00'}
-        print(f"  Loaded: AETCR Camps ({len(geojson['features'])} camps)")
-
-if aetcr_layers:
-    create_map_html(
-        "AETCR REINTEGRATION CAMPS",
-        "Former FARC Camp Locations | CRITICAL TARGET DATA",
-        aetcr_layers,
-        "aetcr_camps_map.html",
-        zoom=6
-    )
+aetcr_files = {
+    'CNR_SEP_2025_MIL1_layer9': ('AETCR Reintegration Camps', '#00FF00'),
+}
 
-# ============================================================
-# MAP 6: Human Rights Data
-# ============================================================
-print("\n=== HUMAN RIGHTS DATA MAP ===")
-ddhh_layers = {}
-
-ddhh_files = glob.glob(os.path.join(RAW_DIR, 'DDHH_*.json'))
-colors = ['#FF0000', '#00FF00', '#0000FF', '#FF8C00', '#800080', '#008080']
-for i, f in enumerate(ddhh_files[:6]):
-    geojson = load_arcgis_json(f)
-    if geojson and geojson['features']:
-        name = os.path.basename(f).replace('.json', '').replace('DDHH_', '').replace('_', ' ')[:30]
-        ddhh_layers[name] = {'geojson': geojson, 'color': colors[i % len(colors)]}
-        print(f"  Loaded: {name} ({len(geojson['features'])} features)")
-
-if ddhh_layers:
-    create_map_html(
-        "HUMAN RIGHTS DATA (DDHH)",
-        "Protection & Victim Data | ergit.presidencia.gov.co",
-        ddhh_layers,
-        "ddhh_human_rights_map.html"
-    )
-
-print("\n" + "="*60)
-print("MAP VISUALIZATION COMPLETE")
-print("="*60)
+# MAP 6: Human Rights Data - first six distinct DDHH_* layers, dense point
+# layers drawn as hexbin counts
+ddhh_glob = 'DDHH_*.json'
+ddhh_colors = ['#FF0000', '#00FF00', '#0000FF', '#FF8C00', '#800080', '#008080']
+
+MAPS = [
+    {
+        'heading': 'SEPTEMBER 2025 MILITARY MAP',
+        'title': "CNR SEPTEMBER 2025 - MILITARY MAP",
+        'subtitle': "All Armed Group Layers | ergit.presidencia.gov.co",
+        'filename': "military_sep2025_full.html",
+        'files': sep_files,
+        'base_files': jul_files,
+    },
+    {
+        'heading': 'JULY 2025 MILITARY MAP',
+        'title': "CNR JULY 2025 - MILITARY MAP",
+        'subtitle': "Armed Group Territories | ergit.presidencia.gov.co",
+        'filename': "military_jul2025_full.html",
+        'files': jul_files,
+    },
+    {
+        'heading': 'CASE 03 MILITARY MAP',
+        'title': "CASE 03 MILITARY MAP",
+        'subtitle': "Special Investigation Zones | ergit.presidencia.gov.co",
+        'filename': "military_caso03.html",
+        'files': caso_files,
+    },
+    {
+        'heading': 'AT ZONES MAP',
+        'title': "AT ZONES MAP",
+        'subtitle': "Administrative Territories | ergit.presidencia.gov.co",
+        'filename': "at_zones_map.html",
+        'files': at_files,
+    },
+    {
+        'heading': 'AETCR CAMPS MAP',
+        'title': "AETCR REINTEGRATION CAMPS",
+        'subtitle': "Former FARC Camp Locations | CRITICAL TARGET DATA",
+        'filename': "aetcr_camps_map.html",
+        'files': aetcr_files,
+    },
+    {
+        'heading': 'HUMAN RIGHTS DATA MAP',
+        'title': "HUMAN RIGHTS DATA (DDHH)",
+        'subtitle': "Protection & Victim Data | ergit.presidencia.gov.co",
+        'filename': "ddhh_human_rights_map.html",
+        'glob': ddhh_glob,
+        'colors': ddhh_colors,
+        'limit': 6,
+        'aggregate': True,
+    },
+]
+
+def map_patterns(spec):
+    """Filename patterns (relative to RAW_DIR) a map page reads from"""
+    if 'glob' in spec:
+        return [spec['glob']]
+    patterns = []
+    for prefix in list(spec['files']) + list(spec.get('base_files', {})):
+        patterns += [f'{prefix}.json', f'{prefix}_*.json']
+    return patterns
+
+def map_layer_files(spec):
+    """Resolve a map definition to a list of (raw file, layer name, color)"""
+    resolved = []
+    if 'glob' in spec:
+        # Several DDHH files are copies of the same layer; keep one of each
+        seen_digests = set()
+        unique_files = []
+        for f in sorted(glob.glob(os.path.join(RAW_DIR, spec['glob']))):
+            digest, _ = raw_store.resolve(f)
+            if digest not in seen_digests:
+                seen_digests.add(digest)
+                unique_files.append(f)
+        colors = spec['colors']
+        for i, f in enumerate(unique_files[:spec['limit']]):
+            name = os.path.basename(f).replace('.json', '').replace('DDHH_', '').replace('_', ' ')[:30]
+            resolved.append((f, name, colors[i % len(colors)]))
+        return resolved
+
+    for prefix, (name, color) in spec['files'].items():
+        # Try different filename patterns
+        for pattern in [f'{prefix}.json', f'{prefix}_*.json']:
+            matches = sorted(glob.glob(os.path.join(RAW_DIR, pattern)))
+            if matches:
+                resolved.append((matches[0], name, color))
+                break
+    return resolved
+
+def build_map(spec):
+    """Load the layers of one map definition and write its page"""
+    print(f"\n=== {spec['heading']} ===")
+    layers = {}
+    base_files = {}
+    if 'base_files' in spec:
+        base_files = {name: f for f, name, color in map_layer_files({'files': spec['base_files']})}
+
+    for filepath, name, color in map_layer_files(spec):
+        geojson = load_arcgis_json(filepath)
+        if geojson and geojson['features']:
+            if spec.get('aggregate') and hexbin.is_dense_point_layer(geojson):
+                layers[name] = {'hexbin': hexbin.aggregate(geojson), 'color': color}
+                print(f"  Loaded: {name} ({len(geojson['features'])} points, hexbinned)")
+                continue
+            layers[name] = {'geojson': geojson, 'color': color}
+            print(f"  Loaded: {name} ({len(geojson['features'])} features)")
+            base = load_arcgis_json(base_files[name]) if name in base_files else None
+            if base and base['features']:
+                delta = edition_delta.diff(base, geojson)
+                layers[name].update({'base': base, 'delta': delta})
+                added, removed, modified = edition_delta.changes(delta)
+                print(f"    vs base edition: {added} added, {removed} removed, {modified} modified")
+
+    if layers:
+        return create_map_html(spec['title'], spec['subtitle'], layers, spec['filename'],
+                               zoom=spec.get('zoom', 6))
+    return None
+
+if __name__ == "__main__":
+    # Refresh the alias table so layers are looked up, not re-hashed
+    raw_store.ingest()
+    for spec in MAPS:
+        build_map(spec)
+    layer_worker.prune_layers(OUT_DIR)
+
+    print(f"\nConverted {len(_converted)} unique layer payloads")
+    print("\n" + "="*60)
+    print("MAP VISUALIZATION COMPLETE")
+    print("="*60)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Watch mode for the map generators
+Monitors RAW DOWNLOADS and the generator scripts and rebuilds, in the
+background, only the pages that depend on the files that changed
+"""
+
+import ast
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import importlib
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import layer_worker
+import raw_store
+import thumbnails
+import visualize_all_maps
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts that write their own page; rebuilt by running them whole
+GENERATOR_SCRIPTS = ['convert_maps.py', 'convert_attacks_map.py', 'fix_ddhh_map.py']
+
+# Modules the pages are built from, in import order. Editing one reloads it
+# and every module after it, then rebuilds every page.
+LIBRARY_MODULES = ['json_backend', 'spatial_index', 'hexbin', 'layer_worker', 'edition_delta', 'raw_store']
+
+# visualize_all_maps functions that turn raw files into converted layers: the
+# layer cache is only dropped when one of these changes. Thumbnails are drawn
+# from those layers as picked by map_layer_files, so they are only redrawn
+# when one of LAYER_FUNCTIONS changes; an edit to the page template is not.
+CONVERSION_FUNCTIONS = ['web_mercator_to_wgs84', 'convert_geometry', 'load_arcgis_json']
+LAYER_FUNCTIONS = CONVERSION_FUNCTIONS + ['map_layer_files']
+
+DEBOUNCE = 0.15        # seconds of quiet before a burst of changes is rebuilt
+POLL_INTERVAL = 0.25   # seconds between scans when inotify is unavailable
+
+# ============================================================
+# FILE WATCHERS
+# ============================================================
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+class InotifyWatcher:
+    """Linux inotify through libc, watching each directory tree recursively"""
+
+    def __init__(self, dirs):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+        for d in dirs:
+            for root, subdirs, files in os.walk(d):
+                self.add(root)
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.paths[wd] = path
+
+    def poll(self, timeout):
+        """Return the set of paths changed within timeout seconds"""
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(buf):
+            wd, mask, cookie, length = struct.unpack_from('iIII', buf, offset)
+            offset += 16
+            name = buf[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if wd not in self.paths or not name:
+                continue
+            path = os.path.join(self.paths[wd], name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add(path)
+                continue
+            changed.add(path)
+        return changed
+
+class PollingWatcher:
+    """Fallback that rescans the watched trees for (mtime, size) changes"""
+
+    def __init__(self, dirs):
+        self.dirs = dirs
+        self.snapshot = self.scan()
+
+    def scan(self):
+        found = {}
+        for d in self.dirs:
+            for root, subdirs, files in os.walk(d):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found[path] = (st.st_mtime, st.st_size)
+        return found
+
+    def poll(self, timeout):
+        """Return the set of paths changed since the last scan"""
+        time.sleep(max(timeout, POLL_INTERVAL))
+        current = self.scan()
+        changed = {p for p in current if self.snapshot.get(p) != current[p]}
+        changed |= set(self.snapshot) - set(current)
+        self.snapshot = current
+        return changed
+
+def make_watcher(dirs):
+    """inotify where the platform has it, polling everywhere else"""
+    try:
+        watcher = InotifyWatcher(dirs)
+        print("[+] Watching with inotify")
+        return watcher
+    except (OSError, AttributeError) as e:
+        print(f"[!] inotify unavailable ({e}), polling every {POLL_INTERVAL}s")
+        return PollingWatcher(dirs)
+
+# ============================================================
+# DEPENDENCIES
+# ============================================================
+
+def code_fingerprint(tree, functions=None):
+    """Hash of a parsed script's imports and the named functions (all of them if None)"""
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)) or
+             (isinstance(n, ast.FunctionDef) and (functions is None or n.name in functions))]
+    return hashlib.sha256(''.join(ast.dump(n) for n in nodes).encode('utf-8')).hexdigest()
+
+def code_fingerprints(path):
+    """(page code, conversion code, layer code) fingerprints of visualize_all_maps, not its map tables"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return (code_fingerprint(tree), code_fingerprint(tree, CONVERSION_FUNCTIONS),
+            code_fingerprint(tree, LAYER_FUNCTIONS))
+
+def script_inputs(path):
+    """Raw file names a generator script mentions as string literals"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return {n.value for n in ast.walk(tree)
+            if isinstance(n, ast.Constant) and isinstance(n.value, str) and n.value.endswith('.json')}
+
+def raw_name(path):
+    """Path relative to RAW_DIR with forward slashes, or None if outside it"""
+    rel = os.path.relpath(path, visualize_all_maps.RAW_DIR)
+    if rel.startswith('..'):
+        return None
+    return rel.replace(os.sep, '/')
+
+def script_thumbnail(script):
+    """The page of a generator script as a set, if thumbnails can draw it"""
+    if script in thumbnails.SCRIPT_LAYERS:
+        return {thumbnails.SCRIPT_LAYERS[script][0]}
+    return set()
+
+class Builder:
+    """Background worker that turns batches of changed paths into page rebuilds"""
+
+    def __init__(self):
+        self.queue = set()
+        self.cond = threading.Condition()
+        self.module = visualize_all_maps
+        self.fingerprints = code_fingerprints(self.module.__file__)
+        self.specs = {spec['filename']: repr(spec) for spec in self.module.MAPS}
+        self.inputs = {}
+        for script in GENERATOR_SCRIPTS:
+            path = os.path.join(SCRIPT_DIR, script)
+            if os.path.exists(path):
+                self.inputs[script] = script_inputs(path)
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, paths):
+        with self.cond:
+            self.queue |= paths
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                paths, self.queue = self.queue, set()
+            try:
+                self.rebuild(paths)
+            except Exception as e:
+                print(f"[!] Rebuild failed: {e}")
+
+    def reload_maps(self):
+        """Reload visualize_all_maps; return (pages to rebuild, pages whose thumbnail changed)"""
+        cache = self.module._converted
+        code, conversion, layers = fingerprints = code_fingerprints(self.module.__file__)
+        module = importlib.reload(self.module)
+
+        # Converted layers stay valid as long as the conversion code is unchanged
+        if conversion == self.fingerprints[1]:
+            module._converted.update(cache)
+        specs = {spec['filename']: repr(spec) for spec in module.MAPS}
+
+        changed = {name for name, r in specs.items() if self.specs.get(name) != r}
+        pages = set(specs) if code != self.fingerprints[0] else changed
+        thumbs = set(specs) if layers != self.fingerprints[2] else changed
+        self.module, self.fingerprints, self.specs = module, fingerprints, specs
+        return pages, thumbs
+
+    def reload_library(self, name):
+        """Reload a page-building module and everything that imports it"""
+        for module_name in LIBRARY_MODULES[LIBRARY_MODULES.index(name):]:
+            if module_name in sys.modules:
+                importlib.reload(sys.modules[module_name])
+        # Conversion code lives in visualize_all_maps, so converted layers stay valid
+        cache = self.module._converted
+        self.module = importlib.reload(self.module)
+        self.module._converted.update(cache)
+        importlib.reload(thumbnails)
+
+    def plan(self, paths):
+        """Work out which map pages, generator scripts and thumbnails depend on the changed paths"""
+        pages = set()
+        scripts = set()
+        thumbs = set()
+
+        for path in paths:
+            name = os.path.basename(path)
+            if os.path.dirname(os.path.abspath(path)) == SCRIPT_DIR:
+                if name == 'visualize_all_maps.py':
+                    rebuilt, redrawn = self.reload_maps()
+                    pages |= rebuilt
+                    thumbs |= redrawn
+                elif name[:-3] in LIBRARY_MODULES:
+                    # Pages change, but the converted layers thumbnails draw do not
+                    self.reload_library(name[:-3])
+                    pages |= set(self.specs)
+                    scripts |= set(self.inputs)
+                elif name == 'thumbnails.py':
+                    importlib.reload(thumbnails)
+                    thumbs |= set(self.specs)
+                    thumbs |= {page for page, load in thumbnails.SCRIPT_LAYERS.values()}
+                elif name in GENERATOR_SCRIPTS:
+                    # thumbnails imports the scripts for their layer loaders
+                    if name[:-3] in sys.modules:
+                        importlib.reload(sys.modules[name[:-3]])
+                    self.inputs[name] = script_inputs(path)
+                    scripts.add(name)
+                    thumbs |= script_thumbnail(name)
+                continue
+
+            rel = raw_name(path)
+            if rel is None or not rel.endswith('.json'):
+                continue
+            for spec in self.module.MAPS:
+                if any(fnmatch.fnmatch(rel, p) for p in self.module.map_patterns(spec)):
+                    pages.add(spec['filename'])
+                    thumbs.add(spec['filename'])
+            for script, inputs in self.inputs.items():
+                if rel in inputs:
+                    scripts.add(script)
+                    thumbs |= script_thumbnail(script)
+        return pages, scripts, thumbs
+
+    def rebuild(self, paths):
+        start = time.perf_counter()
+        pages, scripts, thumbs = self.plan(paths)
+        if not pages and not scripts and not thumbs:
+            return
+
+        rendered = []
+        for spec in self.module.MAPS:
+            if spec['filename'] in pages:
+                self.module.build_map(spec)
+            if spec['filename'] in thumbs and thumbnails.render_map(spec):
+                rendered.append(spec['filename'])
+        for script in sorted(scripts):
+            print(f"\n=== {script} ===")
+            subprocess.run([sys.executable, script], cwd=SCRIPT_DIR)
+        for script, (filename, load) in thumbnails.SCRIPT_LAYERS.items():
+            if filename in thumbs and thumbnails.render_script(script):
+                rendered.append(filename)
+
+        if rendered:
+            thumbnails.update_index(rendered)
+        layer_worker.prune_layers(visualize_all_maps.OUT_DIR)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[+] Rebuilt {len(pages) + len(scripts)} target(s) in {elapsed:.0f} ms")
+
+def watch():
+    """Build once to warm the layer cache, then rebuild on every change burst"""
+    raw_store.ingest()
+    for spec in visualize_all_maps.MAPS:
+        visualize_all_maps.build_map(spec)
+    thumbnails.update_index(thumbnails.render_all())
+    layer_worker.prune_layers(visualize_all_maps.OUT_DIR)
+
+    watcher = make_watcher([visualize_all_maps.RAW_DIR, SCRIPT_DIR])
+    builder = Builder()
+    pending = set()
+    last_change = 0.0
+
+    print("\n[+] Watching for changes (Ctrl+C to stop)")
+    while True:
+        changed = watcher.poll(DEBOUNCE / 3)
+        if changed:
+            pending |= changed
+            last_change = time.monotonic()
+        elif pending and time.monotonic() - last_change >= DEBOUNCE:
+            builder.submit(pending)
+            pending = set()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("MAP WATCH MODE")
+    print("=" * 60)
+
+    try:
+        watch()
+    except KeyboardInterrupt:
+        print("\n[+] Stopped")